@@ -1,19 +1,34 @@
 # app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
+import asyncio
 
 from db.sqlite_conn import init_db
 from routes.chat_routes import chat_router
 from routes.thread_routes import thread_router
 from routes.documents_routes import documents_router
+from routes.admin_routes import admin_router
+from services.reconcile_service import reconcile_loop
+from services.tiering_service import tiering_loop
+from services.summary_service import resume_pending_summaries
+from services import metrics
+from services.profiling import ProfilingMiddleware
+from services.document_service import aclose_vector_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
     print("✅ SQLite initialized → ragchatbot.db")
+    await asyncio.to_thread(resume_pending_summaries)
+    reconciler = asyncio.create_task(reconcile_loop())
+    tiering    = asyncio.create_task(tiering_loop())
     yield
+    reconciler.cancel()
+    tiering.cancel()
+    await aclose_vector_client()
 
 
 app = FastAPI(title="RAG Chatbot API 🤖", lifespan=lifespan)
@@ -28,12 +43,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id", "X-Profile-Id"],   # ✅ resumable /chat/stream, profiling
 )
 
+# ✅ Opt-in profiling — X-Profile header ya PROFILE_SAMPLE_RATE
+app.add_middleware(ProfilingMiddleware)
+
 @app.get("/")
 def home():
     return {"message": "RAG Chatbot running 🚀"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return metrics.render_prometheus()
+
 app.include_router(chat_router,      prefix="/chat",      tags=["Chat"])
 app.include_router(thread_router,    prefix="/thread",    tags=["Thread"])
-app.include_router(documents_router, prefix="/documents", tags=["Documents"])
\ No newline at end of file
+app.include_router(documents_router, prefix="/documents", tags=["Documents"])
+app.include_router(admin_router,     prefix="/admin",     tags=["Admin"])
\ No newline at end of file
@@ -0,0 +1,75 @@
+# bench_ann.py
+# ─────────────────────────────────────────────
+# Local ANN index — recall@k aur latency vs exact search
+#   python bench_ann.py                      # ANN_INDEX_DIR ke saare shards
+#   python bench_ann.py --thread <thread_id> # sirf ek thread ke documents
+#   python bench_ann.py --nprobe 4 8 16 --k 10 --queries 200
+#
+#   Queries: stored chunk vectors ke random mixtures + noise, taaki
+#   query khud index me na ho (self-match recall ko inflate karta).
+# ─────────────────────────────────────────────
+
+import os
+import json
+import argparse
+
+import numpy as np
+
+from services import ann_index
+
+
+def _doc_ids(thread_id: str = None) -> list[str]:
+    if thread_id:
+        from db.sqlite_conn import get_connection
+        conn = get_connection()
+        try:
+            rows = conn.execute("SELECT doc_id FROM documents WHERE thread_id = ?", (thread_id,)).fetchall()
+        finally:
+            conn.close()
+        return [r["doc_id"] for r in rows if ann_index.has_shard(r["doc_id"])]
+
+    if not os.path.isdir(ann_index.ANN_DIR):
+        return []
+    return sorted(
+        e.name for e in os.scandir(ann_index.ANN_DIR)
+        if e.is_dir() and ann_index.has_shard(e.name)
+    )
+
+
+def _queries(doc_ids: list[str], n: int, seed: int = 0) -> np.ndarray:
+    rng    = np.random.default_rng(seed)
+    shards = [ann_index.open_shard(d) for d in doc_ids]
+    out    = []
+    for _ in range(n):
+        picks = []
+        for _ in range(2):
+            shard = shards[rng.integers(len(shards))]
+            picks.append(np.asarray(shard.vectors[rng.integers(len(shard))]))
+        q = picks[0] + picks[1] + 0.5 * rng.standard_normal(len(picks[0])) / np.sqrt(len(picks[0]))
+        out.append(q)
+    return np.stack(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ANN recall / latency vs exact search")
+    parser.add_argument("--thread", help="restrict to one thread's documents")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[ann_index.ANN_NPROBE])
+    args = parser.parse_args()
+
+    doc_ids = _doc_ids(args.thread)
+    if not doc_ids:
+        print(f"⚠️  No ANN shards found in '{ann_index.ANN_DIR}'")
+        return
+
+    vectors = sum(len(ann_index.open_shard(d)) for d in doc_ids)
+    print(f"🧭 {len(doc_ids)} shards, {vectors} vectors, {args.queries} queries, k={args.k}")
+
+    queries = _queries(doc_ids, args.queries)
+    for nprobe in args.nprobe:
+        print(json.dumps(ann_index.evaluate(doc_ids, queries, k=args.k, nprobe=nprobe)))
+
+
+if __name__ == "__main__":
+    main()
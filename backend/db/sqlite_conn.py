@@ -17,7 +17,11 @@ def init_db():
             thread_id   TEXT PRIMARY KEY,
             user_id     TEXT NOT NULL,
             name        TEXT NOT NULL DEFAULT 'New Chat',
-            created_at  TEXT NOT NULL
+            created_at  TEXT NOT NULL,
+            last_activity_at     TEXT,
+            message_count        INTEGER NOT NULL DEFAULT 0,
+            last_message_preview TEXT,
+            document_count       INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS messages (
@@ -34,7 +38,26 @@ def init_db():
             filename    TEXT NOT NULL,
             file_path   TEXT NOT NULL,
             chunk_count INTEGER NOT NULL DEFAULT 0,
-            uploaded_at TEXT NOT NULL
+            uploaded_at TEXT NOT NULL,
+            tier        TEXT NOT NULL DEFAULT 'hot' CHECK(tier IN ('hot', 'cold')),
+            tiered_at   TEXT
+        );
+
+        -- Ingestion ke baad precomputed summary + outline (JSON)
+        CREATE TABLE IF NOT EXISTS document_summaries (
+            doc_id      TEXT PRIMARY KEY REFERENCES documents(doc_id) ON DELETE CASCADE,
+            status      TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'ready', 'failed')),
+            summary     TEXT,
+            outline     TEXT,
+            sections    TEXT,
+            updated_at  TEXT NOT NULL
+        );
+
+        -- Background jobs ke checkpoints / reports (key → JSON)
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            key         TEXT PRIMARY KEY,
+            value       TEXT NOT NULL,
+            updated_at  TEXT NOT NULL
         );
 
         CREATE INDEX IF NOT EXISTS idx_messages_thread
@@ -42,9 +65,135 @@ def init_db():
 
         CREATE INDEX IF NOT EXISTS idx_documents_thread
             ON documents(thread_id);
+    """)
+    _migrate_threads(conn)
+    _migrate_documents(conn)
+    _migrate_messages_fts(conn)
+    conn.executescript("""
+        DROP INDEX IF EXISTS idx_threads_user;
 
-        CREATE INDEX IF NOT EXISTS idx_threads_user
-            ON threads(user_id);
+        -- Sidebar listing: keyset pagination on (last_activity_at, thread_id)
+        CREATE INDEX IF NOT EXISTS idx_threads_user_activity
+            ON threads(user_id, last_activity_at DESC, thread_id DESC);
     """)
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+
+# ─────────────────────────────────────────────
+# Denormalized thread columns — purane DBs ke liye ALTER + backfill
+# ─────────────────────────────────────────────
+THREAD_COLUMNS = {
+    "last_activity_at":     "TEXT",
+    "message_count":        "INTEGER NOT NULL DEFAULT 0",
+    "last_message_preview": "TEXT",
+    "document_count":       "INTEGER NOT NULL DEFAULT 0",
+}
+
+PREVIEW_CHARS = 120
+
+
+def _add_missing_columns(conn, table: str, columns: dict) -> list:
+    existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+    missing  = [c for c in columns if c not in existing]
+    for col in missing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {columns[col]}")
+    return missing
+
+
+def _migrate_threads(conn):
+    missing = _add_missing_columns(conn, "threads", THREAD_COLUMNS)
+
+    if missing:
+        conn.execute(f"""
+            UPDATE threads SET
+                message_count = (
+                    SELECT COUNT(*) FROM messages m WHERE m.thread_id = threads.thread_id
+                ),
+                last_activity_at = COALESCE(
+                    (SELECT MAX(m.created_at) FROM messages m WHERE m.thread_id = threads.thread_id),
+                    created_at
+                ),
+                last_message_preview = (
+                    SELECT substr(m.content, 1, {PREVIEW_CHARS}) FROM messages m
+                    WHERE m.thread_id = threads.thread_id ORDER BY m.id DESC LIMIT 1
+                ),
+                document_count = (
+                    SELECT COUNT(*) FROM documents d WHERE d.thread_id = threads.thread_id
+                )
+        """)
+        print(f"🔧 threads migrated: added {', '.join(missing)}")
+
+    conn.execute(
+        "UPDATE threads SET last_activity_at = created_at WHERE last_activity_at IS NULL"
+    )
+
+
+# ─────────────────────────────────────────────
+# Vector tiering columns — hot = live index, cold = local archive
+# ─────────────────────────────────────────────
+DOCUMENT_COLUMNS = {
+    "tier":      "TEXT NOT NULL DEFAULT 'hot'",
+    "tiered_at": "TEXT",
+}
+
+
+def _migrate_documents(conn):
+    missing = _add_missing_columns(conn, "documents", DOCUMENT_COLUMNS)
+    if missing:
+        print(f"🔧 documents migrated: added {', '.join(missing)}")
+
+
+# ─────────────────────────────────────────────
+# Full-text search over messages.content (FTS5, external content)
+#   Triggers index ko messages ke saath sync rakhte hain; thread delete
+#   ka cascade bhi delete trigger fire karta hai.
+# ─────────────────────────────────────────────
+def _migrate_messages_fts(conn):
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).fetchone()
+
+    conn.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            content,
+            content='messages',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END;
+    """)
+
+    # One-shot backfill — purane DB me FTS table abhi bani hai
+    if not existed:
+        rebuild_message_index(conn)
+
+
+def rebuild_message_index(conn):
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    count = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    if count:
+        print(f"🔧 messages_fts backfilled: {count} messages indexed")
+
+
+def refresh_document_count(conn, thread_id: str):
+    conn.execute(
+        """UPDATE threads SET document_count = (
+               SELECT COUNT(*) FROM documents WHERE thread_id = ?
+           ) WHERE thread_id = ?""",
+        (thread_id, thread_id),
+    )
\ No newline at end of file
@@ -0,0 +1,415 @@
+# eval_retrieval.py
+# ─────────────────────────────────────────────
+# Offline retrieval regression harness
+#   Golden set (PDF, question, expected pages) ko recorded embeddings
+#   aur local exact-cosine vector store pe replay karta hai — koi
+#   network nahi. Chunking, query enrichment, fetch_k, thresholds aur
+#   passage selection wahi services/retrieval.py wala code hai jo
+#   production chalata hai.
+#
+#   Report: recall@k, context recall (expected pages jo LLM tak gaye),
+#   chunks + chars sent per query, fallback rate, retrieval latency
+#   percentiles. Budget toota → exit code 1.
+#
+#   Fixtures ({EVAL_FIXTURES_DIR}, default eval_fixtures/):
+#     golden.json     — threads + cases (format: golden.example.json)
+#     budgets.json    — {"min_<metric>": x, "max_<metric>": y, ...}
+#     pdfs/           — golden PDFs
+#     embeddings.npz  — recorded vectors, text ke sha1 se keyed
+#
+#   Usage:
+#     python eval_retrieval.py                 # offline replay + budget check
+#     python eval_retrieval.py --record        # missing embeddings record (OPENAI_API_KEY)
+#     python eval_retrieval.py --json out.json # full report bhi likho
+#
+#   golden.json ka "embedding_model" (default: production model) batata
+#   hai ki vectors kis embedder se record hue. "local-hash-v1" ek
+#   deterministic offline embedder hai (hashed bag-of-words + shared
+#   component) — bina API key ke fixtures bante hain aur chunking /
+#   fetch_k / threshold / keyword regressions pakde jaate hain, lekin
+#   absolute scores OpenAI jaise nahi hote. Production-faithful scores
+#   ke liye model hata kar --record chalao.
+#
+#   Chunking ya GENERIC_KEYWORDS badle toh naye chunk/query texts ke
+#   embeddings missing honge — replay exit code 2 deta hai, --record
+#   sirf woh missing texts embed karta hai.
+# ─────────────────────────────────────────────
+
+import os
+import io
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from contextlib import redirect_stdout
+from typing import List, Optional
+
+import numpy as np
+
+from services import metrics
+from services.retrieval import (
+    EMBEDDING_MODEL,
+    load_chunks,
+    prepare_query,
+    _search_plan,
+    select_passages,
+    format_context,
+)
+
+FIXTURES_DIR = os.getenv("EVAL_FIXTURES_DIR", "eval_fixtures")
+RECALL_KS    = (1, 5, 10)
+RECORD_BATCH = 100
+
+EXIT_OK, EXIT_BUDGET, EXIT_FIXTURES = 0, 1, 2
+
+LOCAL_EMBEDDER    = "local-hash-v1"
+LOCAL_DIM         = 512
+LOCAL_SHARED      = 0.7        # shared component ka weight (cosine floor)
+LOCAL_MIN_TOKEN   = 3
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# ─────────────────────────────────────────────
+# 1. Recorded embeddings
+# ─────────────────────────────────────────────
+class EmbeddingCache:
+    def __init__(self, path: str):
+        self.path    = path
+        self.model   = EMBEDDING_MODEL
+        self.vectors: dict[str, np.ndarray] = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.model = str(data["model"])
+                for key, vec in zip(data["keys"].tolist(), data["vectors"]):
+                    self.vectors[key] = vec
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.vectors.get(_text_key(text))
+
+    def add(self, texts: List[str], vectors: List[List[float]]) -> None:
+        for text, vec in zip(texts, vectors):
+            self.vectors[_text_key(text)] = np.asarray(vec, dtype=np.float32)
+
+    def save(self) -> None:
+        keys = sorted(self.vectors)
+        tmp  = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                model=np.asarray(self.model),
+                keys=np.asarray(keys),
+                vectors=np.stack([self.vectors[k] for k in keys]),
+            )
+        os.replace(tmp, self.path)
+
+
+# ─────────────────────────────────────────────
+# 2. Local vector backend — exact cosine, Pinecone-style $eq filters
+# ─────────────────────────────────────────────
+class LocalVectorStore:
+    def __init__(self):
+        self.docs: list = []
+        self._rows: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, doc, vector: np.ndarray) -> None:
+        self.docs.append(doc)
+        self._rows.append(vector / (np.linalg.norm(vector) or 1.0))
+        self._matrix = None
+
+    def _match(self, doc, search_filter: dict) -> bool:
+        return all(doc.metadata.get(field) == cond["$eq"] for field, cond in search_filter.items())
+
+    def search(self, vector: np.ndarray, top_k: int, search_filter: dict) -> list:
+        if self._matrix is None:
+            self._matrix = np.stack(self._rows)
+        idx = np.fromiter(
+            (i for i, d in enumerate(self.docs) if self._match(d, search_filter)), dtype=np.int64
+        )
+        if not len(idx) or top_k <= 0:
+            return []
+        query  = vector / (np.linalg.norm(vector) or 1.0)
+        scores = self._matrix[idx] @ query
+        top    = np.argsort(-scores)[:top_k]
+        return [(self.docs[idx[i]], float(scores[i])) for i in top]
+
+
+# ─────────────────────────────────────────────
+# 3. Fixtures → threads
+# ─────────────────────────────────────────────
+def _load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_corpus(golden: dict, fixtures_dir: str) -> dict:
+    """thread name → {"docs": documents rows, "chunks": [Document]}."""
+    chunk_cache: dict[str, list] = {}
+    corpus = {}
+    for thread_id, filenames in golden["threads"].items():
+        docs, chunks = [], []
+        for filename in filenames:
+            if filename not in chunk_cache:
+                path = os.path.join(fixtures_dir, "pdfs", filename)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"fixture PDF missing: {path}")
+                with redirect_stdout(io.StringIO()):
+                    chunk_cache[filename] = load_chunks(path)
+            doc_id = f"{thread_id}/{filename}"
+            for chunk in chunk_cache[filename]:
+                doc = chunk.model_copy(deep=True)
+                doc.metadata.update({"doc_id": doc_id, "thread_id": thread_id, "filename": filename})
+                chunks.append(doc)
+            docs.append({
+                "doc_id":      doc_id,
+                "filename":    filename,
+                "chunk_count": len(chunk_cache[filename]),
+            })
+        corpus[thread_id] = {"docs": docs, "chunks": chunks}
+    return corpus
+
+
+def _texts_needed(golden: dict, corpus: dict) -> tuple[list, list]:
+    chunk_texts = {c.page_content for t in corpus.values() for c in t["chunks"]}
+    with redirect_stdout(io.StringIO()):
+        query_texts = {prepare_query(case["question"])[0] for case in golden["cases"]}
+    return sorted(chunk_texts), sorted(query_texts)
+
+
+def _local_embed(text: str) -> np.ndarray:
+    """Deterministic offline embedding: signed feature hashing of word counts."""
+    vec = np.zeros(LOCAL_DIM, dtype=np.float32)
+    tokens = Counter(t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) >= LOCAL_MIN_TOKEN)
+    for token, count in tokens.items():
+        digest = hashlib.sha1(token.encode("utf-8")).digest()
+        idx    = 1 + int.from_bytes(digest[:4], "little") % (LOCAL_DIM - 1)
+        sign   = 1.0 if digest[4] & 1 else -1.0
+        vec[idx] += sign * (1.0 + np.log(count))
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec *= np.sqrt(1 - LOCAL_SHARED) / norm
+    # Dim 0 sab texts me common — unrelated texts ka cosine ~LOCAL_SHARED,
+    # related texts production thresholds (0.70 / 0.75) ke upar
+    vec[0] = np.sqrt(LOCAL_SHARED)
+    return vec
+
+
+class _LocalEmbeddings:
+    def embed_documents(self, texts: List[str]) -> list:
+        return [_local_embed(t) for t in texts]
+
+    def embed_query(self, text: str):
+        return _local_embed(text)
+
+
+def _embedder(model: str):
+    if model == LOCAL_EMBEDDER:
+        return _LocalEmbeddings()
+    from langchain_openai import OpenAIEmbeddings   # sirf --record me network
+    from dotenv import load_dotenv
+    load_dotenv()
+    return OpenAIEmbeddings(model=model, openai_api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def record(cache: EmbeddingCache, chunk_texts: list, query_texts: list, model: str) -> int:
+    embeddings = _embedder(model)
+    if cache.model != model:
+        cache.vectors.clear()     # dusre model ke vectors mix nahi hote
+    cache.model = model
+
+    missing_chunks  = [t for t in chunk_texts if cache.get(t) is None]
+    missing_queries = [t for t in query_texts if cache.get(t) is None]
+    for i in range(0, len(missing_chunks), RECORD_BATCH):
+        batch = missing_chunks[i:i + RECORD_BATCH]
+        cache.add(batch, embeddings.embed_documents(batch))
+    for text in missing_queries:
+        cache.add([text], [embeddings.embed_query(text)])
+
+    if missing_chunks or missing_queries:
+        cache.save()
+    return len(missing_chunks) + len(missing_queries)
+
+
+# ─────────────────────────────────────────────
+# 4. Replay
+# ─────────────────────────────────────────────
+def _fallbacks() -> float:
+    return metrics.snapshot().get("retrieval_fallback_total", 0.0)
+
+
+def run_case(case: dict, thread: dict, thread_id: str, store: LocalVectorStore,
+             cache: EmbeddingCache, k: int, repeat: int) -> dict:
+    expected = {(f, p) for f, pages in case["expected"].items() for p in pages}
+    total_chunks = sum(d["chunk_count"] for d in thread["docs"])
+
+    latencies = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            fallbacks_before = _fallbacks()
+            t0 = time.perf_counter()
+
+            query, is_generic = prepare_query(case["question"])
+            query_vector = cache.get(query)
+            hits = []
+            for search_filter, top_k in _search_plan(thread_id, thread["docs"], is_generic, k):
+                hits += store.search(query_vector, top_k, search_filter)
+            passages = select_passages(hits, total_chunks, is_generic, k)
+            context  = format_context(passages) if passages else ""
+
+            latencies.append((time.perf_counter() - t0) * 1000)
+            fallback = _fallbacks() > fallbacks_before
+
+    # Raw ranking (selection se pehle) — unique pages, score order
+    ranked_pages = []
+    for doc, _ in sorted(hits, key=lambda h: h[1], reverse=True):
+        page = (doc.metadata["filename"], doc.metadata["page_label"])
+        if page not in ranked_pages:
+            ranked_pages.append(page)
+
+    filenames = {d["doc_id"]: d["filename"] for d in thread["docs"]}
+    sent_pages = {(filenames[p["doc_id"]], p["page"]) for p in passages}
+
+    result = {
+        "thread":         thread_id,
+        "question":       case["question"],
+        "is_generic":     is_generic,
+        "candidates":     len(hits),
+        "chunks_sent":    len(passages),
+        "chars_sent":     len(context),
+        "fallback":       fallback,
+        "context_recall": len(expected & sent_pages) / len(expected) if expected else 1.0,
+        "latency_ms":     latencies,
+    }
+    for n in RECALL_KS:
+        result[f"recall_at_{n}"] = (
+            len(expected & set(ranked_pages[:n])) / len(expected) if expected else 1.0
+        )
+    return result
+
+
+def summarize(results: List[dict]) -> dict:
+    chunks    = np.array([r["chunks_sent"] for r in results], dtype=float)
+    chars     = np.array([r["chars_sent"] for r in results], dtype=float)
+    latencies = np.array([ms for r in results for ms in r["latency_ms"]])
+
+    report = {
+        "cases":               len(results),
+        "context_recall":      float(np.mean([r["context_recall"] for r in results])),
+        "mean_chunks_sent":    float(chunks.mean()),
+        "p95_chunks_sent":     float(np.percentile(chunks, 95)),
+        "mean_chars_sent":     float(chars.mean()),
+        "p95_chars_sent":      float(np.percentile(chars, 95)),
+        "fallback_rate":       float(np.mean([r["fallback"] for r in results])),
+        "latency_p50_ms":      float(np.percentile(latencies, 50)),
+        "latency_p95_ms":      float(np.percentile(latencies, 95)),
+        "latency_p99_ms":      float(np.percentile(latencies, 99)),
+    }
+    for n in RECALL_KS:
+        report[f"recall_at_{n}"] = float(np.mean([r[f"recall_at_{n}"] for r in results]))
+    return report
+
+
+def check_budgets(report: dict, budgets: dict) -> List[str]:
+    violations = []
+    for key, limit in budgets.items():
+        kind, metric = key[:4], key[4:]
+        if kind not in ("min_", "max_") or metric not in report:
+            violations.append(f"unknown budget '{key}'")
+            continue
+        value = report[metric]
+        if (kind == "min_" and value < limit) or (kind == "max_" and value > limit):
+            violations.append(f"{metric} = {value:.4g} ({'<' if kind == 'min_' else '>'} budget {limit})")
+    return violations
+
+
+def _print_results(results: List[dict], report: dict) -> None:
+    print(f"{'question':<48} {'R@5':>5} {'R@10':>5} {'ctxR':>5} {'chunks':>6} {'chars':>7} {'fb':>3}")
+    for r in results:
+        print(
+            f"{r['question'][:48]:<48} {r['recall_at_5']:>5.2f} {r['recall_at_10']:>5.2f} "
+            f"{r['context_recall']:>5.2f} {r['chunks_sent']:>6} {r['chars_sent']:>7} "
+            f"{'✓' if r['fallback'] else '':>3}"
+        )
+    print()
+    for key, value in report.items():
+        print(f"  {key:<20} {value:.4g}" if isinstance(value, float) else f"  {key:<20} {value}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline retrieval quality / latency regression check")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--record", action="store_true", help="embed missing texts (needs network)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="write full report here")
+    args = parser.parse_args(argv)
+
+    golden_path = os.path.join(args.fixtures, "golden.json")
+    if not os.path.exists(golden_path):
+        print(f"❌ {golden_path} not found — see {args.fixtures}/golden.example.json")
+        return EXIT_FIXTURES
+
+    golden = _load_json(golden_path)
+    try:
+        corpus = load_corpus(golden, args.fixtures)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return EXIT_FIXTURES
+
+    cache = EmbeddingCache(os.path.join(args.fixtures, "embeddings.npz"))
+    chunk_texts, query_texts = _texts_needed(golden, corpus)
+
+    model = golden.get("embedding_model", EMBEDDING_MODEL)
+    if model not in (EMBEDDING_MODEL, LOCAL_EMBEDDER):
+        print(f"❌ Unknown embedding_model '{model}' (use '{EMBEDDING_MODEL}' or '{LOCAL_EMBEDDER}')")
+        return EXIT_FIXTURES
+
+    if args.record:
+        n = record(cache, chunk_texts, query_texts, model)
+        print(f"✅ Recorded {n} new embeddings with '{model}' ({len(cache.vectors)} total)")
+
+    if cache.vectors and cache.model != model:
+        print(f"❌ Fixtures recorded with '{cache.model}', golden set expects '{model}' — re-record")
+        return EXIT_FIXTURES
+    missing = sum(cache.get(t) is None for t in chunk_texts + query_texts)
+    if missing:
+        print(f"❌ {missing} chunk/query texts have no recorded embedding "
+              f"(chunking or query enrichment changed?) — run with --record")
+        return EXIT_FIXTURES
+
+    store = LocalVectorStore()
+    for thread in corpus.values():
+        for chunk in thread["chunks"]:
+            store.add(chunk, cache.get(chunk.page_content))
+
+    results = [
+        run_case(case, corpus[case["thread"]], case["thread"], store, cache, args.k, args.repeat)
+        for case in golden["cases"]
+    ]
+    report = summarize(results)
+    _print_results(results, report)
+
+    budgets_path = os.path.join(args.fixtures, "budgets.json")
+    violations = check_budgets(report, _load_json(budgets_path)) if os.path.exists(budgets_path) else []
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"report": report, "violations": violations, "cases": results}, f, indent=2)
+
+    if violations:
+        print("\n❌ Budget regressions:")
+        for v in violations:
+            print(f"  - {v}")
+        return EXIT_BUDGET
+    print("\n✅ All retrieval budgets met")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
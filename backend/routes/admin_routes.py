@@ -0,0 +1,40 @@
+# routes/admin_routes.py
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from services.profiling import is_admin, list_profiles, load_profile, load_folded
+
+admin_router = APIRouter()
+
+
+def _require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+# GET /admin/profiles
+@admin_router.get("/profiles")
+def list_profiles_api(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    profiles = list_profiles()
+    return {"profiles": profiles, "count": len(profiles)}
+
+
+# GET /admin/profiles/{profile_id} — metadata + tracemalloc top allocations
+@admin_router.get("/profiles/{profile_id}")
+def get_profile_api(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    meta = load_profile(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return meta
+
+
+# GET /admin/profiles/{profile_id}/folded — flamegraph.pl / speedscope input
+@admin_router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded_api(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    folded = load_folded(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return folded
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from fastapi.responses import StreamingResponse
+from typing import Optional
 from services.chat_services import process_chat_message, stream_chat_message
+from services.stream_buffer import start_stream, get_stream, sse_events, parse_last_event_id
 from schemas.chat_schema import ChatRequest, ChatResponse
-import json
 
 chat_router = APIRouter()
 
@@ -13,19 +14,40 @@ async def chat_endpoint(request: ChatRequest):
         raise HTTPException(status_code=404, detail=result["error"])
     return ChatResponse(reply=result["reply"], thread_id=request.thread_id)
 
-# ✅ Streaming endpoint
+
+SSE_HEADERS = {
+    "Cache-Control":      "no-cache",
+    "X-Accel-Buffering":  "no",
+}
+
+
+# ✅ Streaming endpoint — generation buffered, resumable via stream_id
 @chat_router.post("/stream")
 async def stream_endpoint(request: ChatRequest):
-    async def event_generator():
-        async for chunk in stream_chat_message(request.thread_id, request.message):
-            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-        yield f"data: {json.dumps({'done': True})}\n\n"
+    buf = start_stream(
+        request.thread_id,
+        stream_chat_message(request.thread_id, request.message),
+    )
+
+    return StreamingResponse(
+        sse_events(buf),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Stream-Id": buf.stream_id},
+    )
+
+
+# ✅ Resume a dropped stream — replays events after Last-Event-ID
+@chat_router.get("/stream/{stream_id}")
+async def resume_stream_endpoint(
+    stream_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    buf = get_stream(stream_id)
+    if buf is None:
+        raise HTTPException(status_code=404, detail="Stream expired or not found.")
 
     return StreamingResponse(
-        event_generator(),
+        sse_events(buf, parse_last_event_id(last_event_id)),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control":      "no-cache",
-            "X-Accel-Buffering":  "no",
-        }
-    )
\ No newline at end of file
+        headers={**SSE_HEADERS, "X-Stream-Id": buf.stream_id},
+    )
@@ -1,15 +1,41 @@
 # routes/documents_routes.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Header
 from services.document_service import (
     process_pdf,
+    process_pdf_batch,
     get_documents_for_thread,
     delete_document,
 )
+from services.reconcile_service import run_reconcile_pass, get_reconcile_report
+from services.profiling import is_admin
 
 documents_router = APIRouter()
 
-ALLOWED_TYPES = {"application/pdf"}
-MAX_SIZE_MB   = 20
+ALLOWED_TYPES   = {"application/pdf"}
+MAX_SIZE_MB     = 20
+MAX_BATCH_FILES = 10
+
+
+# ─────────────────────────────────────────────
+# Validation — single + batch upload dono ke liye
+# ─────────────────────────────────────────────
+def _validation_error(file: UploadFile, file_bytes: bytes) -> Optional[str]:
+    # ✅ Check 1: File type
+    if file.content_type not in ALLOWED_TYPES:
+        return "❌ Invalid file type. Only PDF files are supported."
+
+    # ✅ Check 2: File size
+    size_mb = len(file_bytes) / (1024 * 1024)
+    if size_mb > MAX_SIZE_MB:
+        return f"❌ File too large ({size_mb:.1f} MB). Maximum allowed size is {MAX_SIZE_MB} MB."
+
+    # ✅ Check 3: Empty file
+    if len(file_bytes) == 0:
+        return "❌ Uploaded file is empty. Please upload a valid PDF."
+
+    return None
 
 
 # ─────────────────────────────────────────────
@@ -20,68 +46,106 @@ async def upload_document(
     thread_id: str = Query(..., description="Thread to attach this PDF to"),
     file: UploadFile = File(...),
 ):
-    # ✅ Check 1: File type
-    if file.content_type not in ALLOWED_TYPES:
+    file_bytes = await file.read()
+
+    error = _validation_error(file, file_bytes)
+    if error:
         raise HTTPException(
             status_code=400,
             detail={
                 "success": False,
                 "toast":   "error",
-                "message": f"❌ Invalid file type. Only PDF files are supported.",
+                "message": error,
             }
         )
 
-    file_bytes = await file.read()
-    size_mb    = len(file_bytes) / (1024 * 1024)
+    result = await asyncio.to_thread(
+        process_pdf,
+        thread_id  = thread_id,
+        file_bytes = file_bytes,
+        filename   = file.filename or "document.pdf",
+    )
 
-    # ✅ Check 2: File size
-    if size_mb > MAX_SIZE_MB:
+    # ✅ Check 4: Processing error (scanned/image PDF with no text)
+    if "error" in result:
         raise HTTPException(
-            status_code=400,
+            status_code=422,
             detail={
                 "success": False,
                 "toast":   "error",
-                "message": f"❌ File too large ({size_mb:.1f} MB). Maximum allowed size is {MAX_SIZE_MB} MB.",
+                "message": f"❌ {result['error']}",
             }
         )
 
-    # ✅ Check 3: Empty file
-    if len(file_bytes) == 0:
+    # ✅ Success
+    return {
+        "success":        True,
+        "toast":          "success",
+        "message":        f"✅ '{file.filename}' uploaded and indexed successfully!",
+        "thread_id":      thread_id,
+        "doc_id":         result["doc_id"],
+        "filename":       result["filename"],
+        "chunks_indexed": result["chunks_indexed"],
+    }
+
+
+# ─────────────────────────────────────────────
+# POST /documents/upload-batch?thread_id=xxx
+#   Multiple PDFs ek saath — parallel ingest, ek SQLite transaction
+# ─────────────────────────────────────────────
+@documents_router.post("/upload-batch")
+async def upload_documents_batch(
+    thread_id: str = Query(..., description="Thread to attach these PDFs to"),
+    files: List[UploadFile] = File(...),
+):
+    if len(files) > MAX_BATCH_FILES:
         raise HTTPException(
             status_code=400,
             detail={
                 "success": False,
                 "toast":   "error",
-                "message": "❌ Uploaded file is empty. Please upload a valid PDF.",
+                "message": f"❌ Too many files. Maximum {MAX_BATCH_FILES} PDFs per upload.",
             }
         )
 
-    result = process_pdf(
-        thread_id  = thread_id,
-        file_bytes = file_bytes,
-        filename   = file.filename or "document.pdf",
+    accepted = []
+    rejected = []
+    for file in files:
+        file_bytes = await file.read()
+        filename   = file.filename or "document.pdf"
+        error      = _validation_error(file, file_bytes)
+        if error:
+            rejected.append({"filename": filename, "error": error})
+        else:
+            accepted.append((file_bytes, filename))
+
+    result = (
+        await asyncio.to_thread(process_pdf_batch, thread_id, accepted)
+        if accepted else {"documents": [], "failed": []}
     )
+    failed = rejected + [
+        {"filename": f["filename"], "error": f"❌ {f['error']}"} for f in result["failed"]
+    ]
 
-    # ✅ Check 4: Processing error (scanned/image PDF with no text)
-    if "error" in result:
+    if not result["documents"]:
         raise HTTPException(
             status_code=422,
             detail={
                 "success": False,
                 "toast":   "error",
-                "message": f"❌ {result['error']}",
+                "message": "❌ None of the uploaded files could be indexed.",
+                "failed":  failed,
             }
         )
 
-    # ✅ Success
     return {
         "success":        True,
-        "toast":          "success",
-        "message":        f"✅ '{file.filename}' uploaded and indexed successfully!",
+        "toast":          "success" if not failed else "warning",
+        "message":        f"✅ {len(result['documents'])} of {len(files)} PDFs uploaded and indexed.",
         "thread_id":      thread_id,
-        "doc_id":         result["doc_id"],
-        "filename":       result["filename"],
-        "chunks_indexed": result["chunks_indexed"],
+        "documents":      result["documents"],
+        "failed":         failed,
+        "chunks_indexed": sum(d["chunks_indexed"] for d in result["documents"]),
     }
 
 
@@ -99,6 +163,35 @@ def list_documents(thread_id: str = Query(...)):
     }
 
 
+# ─────────────────────────────────────────────
+# Reconcile routes — admin only (X-Admin-Token = PROFILE_ADMIN_TOKEN)
+# ─────────────────────────────────────────────
+def _require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+# ─────────────────────────────────────────────
+# GET /documents/reconcile — last orphan-GC report
+# ─────────────────────────────────────────────
+@documents_router.get("/reconcile")
+def reconcile_status(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return {"success": True, **get_reconcile_report()}
+
+
+# ─────────────────────────────────────────────
+# POST /documents/reconcile — run one pass now
+# ─────────────────────────────────────────────
+@documents_router.post("/reconcile")
+def reconcile_now(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    report = run_reconcile_pass()
+    if "error" in report:
+        raise HTTPException(status_code=409, detail=report["error"])
+    return {"success": True, **report}
+
+
 # ─────────────────────────────────────────────
 # DELETE /documents/{doc_id}
 # ─────────────────────────────────────────────
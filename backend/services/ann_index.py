@@ -0,0 +1,258 @@
+# services/ann_index.py
+# ─────────────────────────────────────────────
+# Local approximate-nearest-neighbour index
+#   Har document ka apna shard (IVF):
+#     {ANN_DIR}/{doc_id}/
+#       centroids.npy  (nlist, d) f32  — coarse quantizer (k-means)
+#       offsets.npy    (nlist+1,) i64  — list boundaries (rows list-order me)
+#       codes.npy      (n, d)    int8  — scan ke liye
+#       scales.npy     (n,)      f32   — per-vector int8 scale
+#       vectors.npy    (n, d)    f32   — exact rerank (sirf candidates touch hote hain)
+#       meta.json                      — ids + chunk metadata/text, same row order
+#   Saari arrays np.load(mmap_mode="r") — process memory me sirf jo pages
+#   scan hote hain.
+#
+#   Storage: vectors.npy (4 bytes/dim) codes.npy (1 byte/dim) se ~4×
+#   bada hai, isliye shard ka ~80% disk float32 rerank copy hai —
+#   text-embedding-3-small (1536 dims) pe ~6 KB/chunk, codes sirf
+#   ~1.5 KB. Scan sirf codes padhta hai; vectors.npy ke sirf rerank
+#   candidates ke pages touch hote hain.
+#
+#   Search: nprobe nearest lists → int8 approximate scores →
+#   top (k × ANN_RERANK_FACTOR) → float32 exact cosine rerank.
+#   Scores cosine hain (Pinecone metric jaisa), isliye retrieval ke
+#   thresholds same rehte hain.
+#
+#   Naya upload = naya shard (baaki shards untouched), delete = shard
+#   directory hatao.
+# ─────────────────────────────────────────────
+
+import os
+import json
+import time
+import shutil
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+ANN_DIR            = os.getenv("ANN_INDEX_DIR", "ann_index")
+ANN_NPROBE         = int(os.getenv("ANN_NPROBE", "8"))
+ANN_RERANK_FACTOR  = 4
+MIN_IVF_VECTORS    = 256        # isse chhote shards flat int8 scan (nlist = 1)
+MAX_LISTS          = 1024
+KMEANS_ITERS       = 10
+KMEANS_SAMPLE      = 20000
+SHARD_CACHE_SIZE   = 256        # open memmap shards
+
+_cache: "OrderedDict[str, Shard]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# ── int8 quantization ─────────────────────────
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _shard_dir(doc_id: str) -> str:
+    return os.path.join(ANN_DIR, doc_id)
+
+
+# ─────────────────────────────────────────────
+# 1. Build — spherical k-means + list-ordered int8 codes
+# ─────────────────────────────────────────────
+def _kmeans(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > KMEANS_SAMPLE:
+        sample = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            # Khaali list → random point se reseed
+            centroids[c] = members.sum(axis=0) if len(members) else sample[rng.integers(len(sample))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def build_shard(doc_id: str, ids: List[str], vectors, metadata: List[dict]) -> int:
+    """Write (or replace) the shard for one document. Returns vectors indexed."""
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    n = len(vectors)
+    if n == 0:
+        return 0
+
+    if n >= MIN_IVF_VECTORS:
+        nlist     = min(int(np.sqrt(n)), MAX_LISTS)
+        centroids = _kmeans(vectors, nlist)
+        assign    = np.argmax(vectors @ centroids.T, axis=1)
+    else:
+        centroids = vectors.mean(axis=0, keepdims=True)
+        assign    = np.zeros(n, dtype=np.int64)
+
+    order   = np.argsort(assign, kind="stable")
+    counts  = np.bincount(assign, minlength=len(centroids))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    vectors = vectors[order]
+    codes, scales = quantize_int8(vectors)
+
+    os.makedirs(ANN_DIR, exist_ok=True)
+    tmp = f"{_shard_dir(doc_id)}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "codes.npy"), codes)
+    np.save(os.path.join(tmp, "scales.npy"), scales)
+    np.save(os.path.join(tmp, "vectors.npy"), vectors)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({
+            "doc_id":   doc_id,
+            "dim":      int(vectors.shape[1]),
+            "nlist":    len(centroids),
+            "ids":      [ids[i] for i in order],
+            "metadata": [metadata[i] for i in order],
+        }, f)
+
+    drop_shard(doc_id)
+    os.replace(tmp, _shard_dir(doc_id))
+    print(f"🧭 ANN shard built for doc_id='{doc_id}': {n} vectors, {len(centroids)} lists")
+    return n
+
+
+def drop_shard(doc_id: str) -> None:
+    with _cache_lock:
+        _cache.pop(doc_id, None)
+    shutil.rmtree(_shard_dir(doc_id), ignore_errors=True)
+
+
+def has_shard(doc_id: str) -> bool:
+    return os.path.exists(os.path.join(_shard_dir(doc_id), "meta.json"))
+
+
+# ─────────────────────────────────────────────
+# 2. Search
+# ─────────────────────────────────────────────
+class Shard:
+    def __init__(self, doc_id: str):
+        path = _shard_dir(doc_id)
+        self.doc_id    = doc_id
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.offsets   = np.load(os.path.join(path, "offsets.npy"))
+        self.codes     = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.scales    = np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+        self.vectors   = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.ids      = meta["ids"]
+        self.metadata = meta["metadata"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nlist = len(self.centroids)
+        if nlist == 1 or nprobe >= nlist:
+            return np.arange(len(self), dtype=np.int64)
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([
+            np.arange(self.offsets[c], self.offsets[c + 1], dtype=np.int64) for c in probe
+        ])
+
+    def search(self, query: np.ndarray, top_k: int, nprobe: int = ANN_NPROBE) -> list[tuple[int, float]]:
+        """Return [(row, exact cosine)] best-first. `query` must be unit-norm."""
+        rows = self._candidate_rows(query, nprobe)
+        if not len(rows) or top_k <= 0:
+            return []
+
+        # Contiguous list ranges → memmap slices cheap rehte hain
+        approx = (self.codes[rows].astype(np.float32) @ query) * self.scales[rows]
+        n_cand = min(top_k * ANN_RERANK_FACTOR, len(rows))
+        cand   = rows[np.argpartition(-approx, n_cand - 1)[:n_cand]] if n_cand < len(rows) else rows
+
+        cand  = np.sort(cand)
+        exact = self.vectors[cand] @ query
+        best  = np.argsort(-exact)[:top_k]
+        return [(int(cand[i]), float(exact[i])) for i in best]
+
+    def exact_search(self, query: np.ndarray, top_k: int) -> list[tuple[int, float]]:
+        scores = np.asarray(self.vectors) @ query
+        best   = np.argsort(-scores)[:top_k]
+        return [(int(i), float(scores[i])) for i in best]
+
+
+def open_shard(doc_id: str) -> Optional[Shard]:
+    with _cache_lock:
+        shard = _cache.get(doc_id)
+        if shard is not None:
+            _cache.move_to_end(doc_id)
+            return shard
+    if not has_shard(doc_id):
+        return None
+    shard = Shard(doc_id)
+    with _cache_lock:
+        _cache[doc_id] = shard
+        while len(_cache) > SHARD_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return shard
+
+
+def search(doc_ids: List[str], query_vector, top_k: int, nprobe: int = ANN_NPROBE,
+           exact: bool = False) -> list[tuple[str, dict, float]]:
+    """Top-k over the given documents' shards → [(id, metadata, score)] best-first."""
+    query = _normalize(np.asarray(query_vector, dtype=np.float32))
+    hits = []
+    for doc_id in doc_ids:
+        shard = open_shard(doc_id)
+        if shard is None:
+            continue
+        rows = shard.exact_search(query, top_k) if exact else shard.search(query, top_k, nprobe)
+        hits += [(shard.ids[r], shard.metadata[r], score) for r, score in rows]
+    hits.sort(key=lambda h: h[2], reverse=True)
+    return hits[:top_k]
+
+
+# ─────────────────────────────────────────────
+# 3. Recall / latency vs exact search
+# ─────────────────────────────────────────────
+def evaluate(doc_ids: List[str], queries, k: int = 10, nprobe: int = ANN_NPROBE) -> dict:
+    ann_ms, exact_ms, recalls = [], [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        truth = search(doc_ids, query, k, exact=True)
+        exact_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        approx = search(doc_ids, query, k, nprobe=nprobe)
+        ann_ms.append((time.perf_counter() - t0) * 1000)
+
+        expected = {h[0] for h in truth}
+        recalls.append(len(expected & {h[0] for h in approx}) / len(expected) if expected else 1.0)
+
+    return {
+        "queries":        len(recalls),
+        "k":              k,
+        "nprobe":         nprobe,
+        "recall_at_k":    float(np.mean(recalls)) if recalls else 0.0,
+        "ann_p50_ms":     float(np.percentile(ann_ms, 50)) if ann_ms else 0.0,
+        "ann_p95_ms":     float(np.percentile(ann_ms, 95)) if ann_ms else 0.0,
+        "exact_p50_ms":   float(np.percentile(exact_ms, 50)) if exact_ms else 0.0,
+        "exact_p95_ms":   float(np.percentile(exact_ms, 95)) if exact_ms else 0.0,
+    }
@@ -1,43 +1,211 @@
 # services/chat_services.py
+import os
+import time
 import asyncio
 from app.graph import chatbot, llm
-from services.document_service import retrieve_context, get_documents_for_thread
+from services.document_service import (
+    asearch_passages,
+    format_context,
+    aembed_query_safe,
+    prepare_query,
+    get_documents_for_thread,
+)
 from services.thread_services import get_thread_history, save_message
+from services.tiering_service import ensure_thread_hot
+from services.summary_service import get_ready_summaries, summary_passages
+from services.query_intent import is_summary_query
+from services.circuit_breaker import CircuitBreaker
+from services import metrics
 from langchain_core.messages import HumanMessage, SystemMessage
-from typing import Dict, AsyncGenerator
+from typing import Dict, AsyncGenerator, List
 
 HISTORY_LIMIT = 20
 
+# ── Latency budget ────────────────────────────
+# Total budget request start se (retrieval bhi count hoti hai); TTFT LLM
+# call start se. Retrieval ke baad TTFT jitna budget na bache toh LLM call
+# hi nahi hoti — extractive answer, breaker failure record nahi hota.
+TTFT_DEADLINE_SECONDS = float(os.getenv("LLM_TTFT_DEADLINE_SECONDS", "10"))
+TOTAL_BUDGET_SECONDS  = float(os.getenv("LLM_TOTAL_BUDGET_SECONDS", "90"))
+INTER_TOKEN_TIMEOUT   = 20.0
+
+EXTRACTIVE_PASSAGES   = 3
+EXTRACTIVE_CHARS      = 700
+
+llm_breaker = CircuitBreaker("llm", failure_threshold=3, reset_timeout=30.0)
+
+
+def _drop_current_turn(history: list, message: str) -> list:
+    # History load user-message save ke saath concurrently chalta hai —
+    # agar naya message already aa gaya ho toh usse hata do (neeche dobara add hota hai)
+    if history and isinstance(history[-1], HumanMessage) and history[-1].content == message:
+        return history[:-1]
+    return history
+
+
+# ─────────────────────────────────────────────
+# Extractive fallback — LLM slow / failing ho toh top passages locally
+# ─────────────────────────────────────────────
+def _extractive_passages(passages: List[dict]) -> str:
+    top = sorted(passages, key=lambda p: p["score"], reverse=True)[:EXTRACTIVE_PASSAGES]
+    blocks = []
+    for p in top:
+        text = p["content"]
+        if len(text) > EXTRACTIVE_CHARS:
+            text = text[:EXTRACTIVE_CHARS].rsplit(" ", 1)[0] + " …"
+        blocks.append(f"**{p['label']}** {text}")
+    return "\n\n".join(blocks)
+
+
+def _llm_budget(started: float) -> float:
+    """Seconds of the total budget left for the LLM call."""
+    return TOTAL_BUDGET_SECONDS - (time.monotonic() - started)
+
+
+def _budget_exhausted(passages: List[dict]) -> str:
+    # Retrieval ne hi budget kha liya — LLM ki galti nahi, breaker me count mat karo
+    metrics.inc("llm_fallback_total", help="Extractive fallbacks served", reason="budget_exhausted")
+    return _extractive_answer(passages, "Finding the relevant passages took too long")
+
+
+def _extractive_answer(passages: List[dict], reason: str) -> str:
+    return (
+        f"⚡ {reason}, so here are the most relevant passages from your PDF:\n\n"
+        f"{_extractive_passages(passages)}"
+    )
+
+
+# ─────────────────────────────────────────────
+# Shared turn preparation
+#   PDF check, user-message save, history load, query embedding —
+#   independent stages concurrently. Time-to-first-token = slowest
+#   stage, not the sum.
+# ─────────────────────────────────────────────
+async def _prepare_turn(thread_id: str, message: str):
+    """Return (docs, history, passages, summary_mode)."""
+    search_query, is_generic = prepare_query(message)
+    embed_task = asyncio.create_task(aembed_query_safe(search_query))
+
+    # Overview / "is there an Abstract?" — precomputed artifacts try karo
+    wants_summary = is_summary_query(message)
+
+    async def _no_summaries():
+        return None
+
+    docs, _, history, artifacts = await asyncio.gather(
+        asyncio.to_thread(get_documents_for_thread, thread_id),
+        asyncio.to_thread(save_message, thread_id, "user", message),
+        asyncio.to_thread(get_thread_history, thread_id, HISTORY_LIMIT),
+        asyncio.to_thread(get_ready_summaries, thread_id) if wants_summary else _no_summaries(),
+    )
+
+    if not docs:
+        embed_task.cancel()
+        return docs, history, [], False
+
+    history = _drop_current_turn(history, message)
+
+    # Saare docs ke summaries ready — retrieval skip
+    if artifacts:
+        embed_task.cancel()
+        metrics.inc("summary_answers_total", help="Turns answered from precomputed summaries")
+        return docs, history, summary_passages(artifacts, message), True
+
+    # Archived (cold) vectors pehle live index me wapas
+    await asyncio.to_thread(ensure_thread_hot, thread_id)
+    passages = await asearch_passages(thread_id, docs, await embed_task, is_generic)
+    return docs, history, passages, False
+
+
+def _system_prompt(context: str, summary_mode: bool) -> SystemMessage:
+    if summary_mode:
+        return SystemMessage(content=(
+            "You are an intelligent PDF assistant. Below are precomputed summaries and section "
+            "outlines of the user's PDF(s).\n\n"
+            "RULES:\n"
+            "1. Answer using ONLY these summaries and outlines.\n"
+            "2. If a section (e.g. 'Abstract', 'Conclusion') appears in an outline, say YES it is "
+            "present, and describe it from its section summary when given.\n"
+            "3. Respect any length the user asks for (e.g. '50 words').\n\n"
+            "=== DOCUMENT SUMMARIES ===\n"
+            f"{context}\n"
+            "=========================="
+        ))
+
+    return SystemMessage(content=(
+        "You are an intelligent PDF assistant. Answer questions using the document context below.\n\n"
+
+        "IMPORTANT RULES:\n"
+        "1. Use ONLY the information from the DOCUMENT CONTEXT below.\n"
+        "2. The context contains extracted text from a PDF — headings, sections, and content are all present.\n"
+        "3. If a section heading like 'Abstract', 'Introduction', 'Conclusion' etc. appears in context,\n"
+        "   confidently say YES it is present and provide its content directly.\n"
+        "4. Do NOT say 'not explicitly mentioned' if the content is clearly there.\n"
+        "5. Answer confidently and directly — do not hedge unnecessarily.\n"
+        "6. If the answer is truly not in the context, say:\n"
+        "   'This information is not available in the uploaded PDF.'\n"
+        "7. Do NOT make up information not in the context.\n\n"
+
+        "=== DOCUMENT CONTEXT ===\n"
+        f"{context}\n"
+        "========================\n\n"
+
+        "Now answer the user's question directly and confidently based on the context above."
+    ))
+
+
+def _final_messages(context: str, summary_mode: bool, history: list, message: str) -> list:
+    # Purane system messages strip
+    clean_history = [m for m in history if not isinstance(m, SystemMessage)]
+    return [_system_prompt(context, summary_mode)] + clean_history + [HumanMessage(content=message)]
+
 
 # ─────────────────────────────────────────────
 # Existing — non-streaming
 # ─────────────────────────────────────────────
 async def process_chat_message(thread_id: str, message: str) -> Dict[str, str]:
     try:
-        docs = get_documents_for_thread(thread_id)
+        started = time.monotonic()
+        docs, history, passages, summary_mode = await _prepare_turn(thread_id, message)
         if not docs:
-            return {
-                "reply":    "⚠️ No PDF found. Please upload a PDF to start a conversation.",
-                "rag_used": False,
-            }
+            reply = "⚠️ No PDF found. Please upload a PDF to start a conversation."
+            await asyncio.to_thread(save_message, thread_id, "assistant", reply)
+            return {"reply": reply, "rag_used": False}
 
-        save_message(thread_id, "user", message)
-        context = retrieve_context(thread_id, message)
+        context = format_context(passages) if passages else ""
         mode    = "pdf" if context else "no_context"
-        history = get_thread_history(thread_id, limit=HISTORY_LIMIT)
-        messages = history + [HumanMessage(content=message)]
 
-        result_state = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: chatbot.invoke({
-                "messages": messages,
+        # LLM ko kam se kam TTFT deadline jitna time milna chahiye, warna
+        # timeout LLM ki failure nahi hai
+        llm_budget = _llm_budget(started)
+        if mode == "pdf" and llm_budget < TTFT_DEADLINE_SECONDS:
+            ai_reply = _budget_exhausted(passages)
+        elif mode == "pdf" and not llm_breaker.allow():
+            ai_reply = _extractive_answer(passages, "The AI model is temporarily unavailable")
+        elif mode == "pdf":
+            # Streaming jaisa hi prompt — summary mode me chhota summary prompt
+            with llm_breaker.attempt():
+                try:
+                    response = await asyncio.wait_for(
+                        llm.ainvoke(_final_messages(context, summary_mode, history, message)),
+                        timeout=llm_budget,
+                    )
+                    ai_reply = response.content
+                    llm_breaker.record_success()
+                except Exception as e:
+                    llm_breaker.record_failure()
+                    metrics.inc("llm_fallback_total", help="Extractive fallbacks served",
+                                reason=type(e).__name__)
+                    ai_reply = _extractive_answer(passages, "The AI model is taking too long to respond")
+        else:
+            result_state = await asyncio.to_thread(chatbot.invoke, {
+                "messages": history + [HumanMessage(content=message)],
                 "mode":     mode,
-                "context":  context or "",
+                "context":  "",
             })
-        )
+            ai_reply = result_state["messages"][-1].content
 
-        ai_reply = result_state["messages"][-1].content
-        save_message(thread_id, "assistant", ai_reply)
+        await asyncio.to_thread(save_message, thread_id, "assistant", ai_reply)
 
         return {"reply": ai_reply, "rag_used": bool(context)}
 
@@ -50,17 +218,18 @@ async def process_chat_message(thread_id: str, message: str) -> Dict[str, str]:
 # ─────────────────────────────────────────────
 async def stream_chat_message(thread_id: str, message: str) -> AsyncGenerator[str, None]:
     try:
-        # Step 1: Check PDF
-        docs = get_documents_for_thread(thread_id)
+        started = time.monotonic()
+
+        # Step 1–3: PDF check, save, history, retrieval
+        docs, history, passages, summary_mode = await _prepare_turn(thread_id, message)
+
         if not docs:
-            yield "⚠️ No PDF found. Please upload a PDF to start a conversation."
+            msg = "⚠️ No PDF found. Please upload a PDF to start a conversation."
+            yield msg
+            await asyncio.to_thread(save_message, thread_id, "assistant", msg)
             return
 
-        # Step 2: Save user message
-        save_message(thread_id, "user", message)
-
-        # Step 3: Retrieve context
-        context = retrieve_context(thread_id, message)
+        context = format_context(passages) if passages else ""
 
         print(f"📥 Query: {message}")
         print(f"📄 Context length: {len(context)} chars")
@@ -74,47 +243,86 @@ async def stream_chat_message(thread_id: str, message: str) -> AsyncGenerator[st
                 f"{', '.join(filenames)}. Please try rephrasing."
             )
             yield msg
-            save_message(thread_id, "assistant", msg)
+            await asyncio.to_thread(save_message, thread_id, "assistant", msg)
             return
 
-        # Step 5: System prompt — IMPROVED
-        history = get_thread_history(thread_id, limit=HISTORY_LIMIT)
+        # Step 5: System prompt — summary mode me chhota prompt
+        final_messages = _final_messages(context, summary_mode, history, message)
 
-        system_prompt = SystemMessage(content=(
-            "You are an intelligent PDF assistant. Answer questions using the document context below.\n\n"
+        # Step 6: Stream tokens — budget khatam ya breaker open ho toh seedha extractive answer
+        if _llm_budget(started) < TTFT_DEADLINE_SECONDS:
+            full_reply = _budget_exhausted(passages)
+            yield full_reply
+            await asyncio.to_thread(save_message, thread_id, "assistant", full_reply)
+            return
 
-            "IMPORTANT RULES:\n"
-            "1. Use ONLY the information from the DOCUMENT CONTEXT below.\n"
-            "2. The context contains extracted text from a PDF — headings, sections, and content are all present.\n"
-            "3. If a section heading like 'Abstract', 'Introduction', 'Conclusion' etc. appears in context,\n"
-            "   confidently say YES it is present and provide its content directly.\n"
-            "4. Do NOT say 'not explicitly mentioned' if the content is clearly there.\n"
-            "5. Answer confidently and directly — do not hedge unnecessarily.\n"
-            "6. If the answer is truly not in the context, say:\n"
-            "   'This information is not available in the uploaded PDF.'\n"
-            "7. Do NOT make up information not in the context.\n\n"
+        if not llm_breaker.allow():
+            full_reply = _extractive_answer(passages, "The AI model is temporarily unavailable")
+            yield full_reply
+            await asyncio.to_thread(save_message, thread_id, "assistant", full_reply)
+            return
 
-            "=== DOCUMENT CONTEXT ===\n"
-            f"{context}\n"
-            "========================\n\n"
+        # TTFT LLM call start se; total budget request start se
+        ttft_deadline  = time.monotonic() + TTFT_DEADLINE_SECONDS
+        total_deadline = started + TOTAL_BUDGET_SECONDS
 
-            "Now answer the user's question directly and confidently based on the context above."
-        ))
+        full_reply = ""
+        finished   = False
+        stream = llm.astream(final_messages).__aiter__()
+        # Cancel / truncation (GeneratorExit) pe half-open trial slot wapas
+        with llm_breaker.attempt():
+            try:
+                while True:
+                    now = time.monotonic()
+                    if full_reply:
+                        timeout = min(INTER_TOKEN_TIMEOUT, total_deadline - now)
+                    else:
+                        timeout = ttft_deadline - now
+                    if timeout <= 0:
+                        raise asyncio.TimeoutError()
 
-        # Strip old system messages
-        clean_history = [m for m in history if not isinstance(m, SystemMessage)]
-        final_messages = [system_prompt] + clean_history + [HumanMessage(content=message)]
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
 
-        # Step 6: Stream tokens
-        full_reply = ""
-        async for chunk in llm.astream(final_messages):
-            token = chunk.content
-            if token:
-                full_reply += token
-                yield token
-
-        # Step 7: Save reply
-        save_message(thread_id, "assistant", full_reply)
+                    token = chunk.content
+                    if token:
+                        full_reply += token
+                        yield token
+
+                llm_breaker.record_success()
+                finished = True
+
+            except Exception as e:
+                # Timeout ya LLM error — retrieval ke passages locally se answer
+                llm_breaker.record_failure()
+                metrics.inc("llm_fallback_total", help="Extractive fallbacks served",
+                            reason=type(e).__name__)
+                print(f"⚠️ LLM fallback ({type(e).__name__}): {e}")
+
+                if full_reply:
+                    tail = (
+                        "\n\n⚠️ The answer was cut short. Most relevant passages:\n\n"
+                        f"{_extractive_passages(passages)}"
+                    )
+                else:
+                    tail = _extractive_answer(passages, "The AI model is taking too long to respond")
+                full_reply += tail
+                finished = True
+                yield tail
+
+            finally:
+                try:
+                    await stream.aclose()
+                except Exception:
+                    pass
+
+                # Step 7: Save reply — finally me, taaki stream truncation ya client
+                # disconnect (GeneratorExit / CancelledError) pe bhi jitna reply
+                # ban chuka hai woh save ho aur history user message pe khatam na ho
+                if finished or full_reply:
+                    await asyncio.to_thread(save_message, thread_id, "assistant", full_reply)
 
     except Exception as e:
         yield f"❌ Error: {str(e)}"
\ No newline at end of file
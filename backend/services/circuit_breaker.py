@@ -0,0 +1,96 @@
+# services/circuit_breaker.py
+# ─────────────────────────────────────────────
+# Circuit breaker for upstream clients (LLM)
+#   closed    → calls allowed; consecutive failures count
+#   open      → calls short-circuited until reset_timeout passes
+#   half_open → ek trial call; success → closed, failure → open
+#   Allowed call ko `with breaker.attempt():` me chalao — call bina
+#   success/failure record kiye ruk jaaye (cancel, generator close) toh
+#   trial slot wapas mil jaata hai.
+# ─────────────────────────────────────────────
+
+import threading
+import time
+from contextlib import contextmanager
+
+from services import metrics
+
+STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name              = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout     = reset_timeout
+        self._state     = "closed"
+        self._failures  = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._outcomes  = 0          # record_success / record_failure calls
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_in_flight = False
+            self._publish()
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            metrics.inc("circuit_breaker_rejected_total", help="Calls short-circuited", breaker=self.name)
+            return False
+
+    @contextmanager
+    def attempt(self):
+        """Scope of one allowed call; frees a half-open trial left without an outcome."""
+        with self._lock:
+            outcomes = self._outcomes
+        try:
+            yield
+        finally:
+            with self._lock:
+                # BaseException (CancelledError / GeneratorExit) — outcome kabhi
+                # record nahi hoga; slot na chhoda toh breaker hamesha reject karega
+                if self._outcomes == outcomes and self._trial_in_flight:
+                    self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes += 1
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != "closed":
+                self._state = "closed"
+                self._publish()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    metrics.inc("circuit_breaker_trips_total", help="Breaker transitions to open",
+                                breaker=self.name)
+                    print(f"🔌 Circuit '{self.name}' OPEN after {self._failures} failure(s)")
+                self._state     = "open"
+                self._opened_at = time.monotonic()
+                self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("circuit_breaker_state", STATE_VALUES[self._state],
+                          help="0 = closed, 1 = half_open, 2 = open", breaker=self.name)
@@ -1,21 +1,35 @@
 # ─────────────────────────────────────────────
 # REQUIRED INSTALLS:
 #   pip install pymupdf langchain-community langchain-openai
-#   pip install langchain-pinecone pinecone-client python-dotenv
+#   pip install langchain-pinecone "pinecone[asyncio]" python-dotenv
 # ─────────────────────────────────────────────
 
 import os
+import time
 import uuid
+import asyncio
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings           # ✅ OpenAI
+from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
-from db.sqlite_conn import get_connection
+from db.sqlite_conn import get_connection, refresh_document_count
+from services.embedding_dispatcher import EmbeddingDispatcher
+from services.summary_service import schedule_summary
+from services import ann_index
+from services.retrieval import (
+    EMBEDDING_MODEL,
+    load_chunks,
+    prepare_query,
+    _search_plan,
+    select_passages,
+    format_context,
+    _assemble_context,
+)
 
 load_dotenv()
 
@@ -39,40 +53,75 @@ if PINECONE_INDEX not in existing_indexes:
     )
 
 pinecone_index = pc.Index(PINECONE_INDEX)
+PINECONE_HOST  = pc.describe_index(PINECONE_INDEX).host   # asyncio client ke liye
 
 # ── OpenAI Embeddings ─────────────────────────
 embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
+    model=EMBEDDING_MODEL,
     openai_api_key=os.getenv("OPENAI_API_KEY"),
 )
 
+# ✅ Shared micro-batching — uploads + queries ek hi rate limit share karte hain
+embedding_dispatcher = EmbeddingDispatcher(embeddings)
+
 vector_store = PineconeVectorStore(
     index=pinecone_index,
-    embedding=embeddings,
+    embedding=embedding_dispatcher,
     text_key="text",
 )
 
-# ── Chunking — page-based ─────────────────────
-# Agar page 3000 chars se badi ho toh split, warna ek page = ek chunk
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=3000,
-    chunk_overlap=100,
-    length_function=len,
-    separators=["\n\n", "\n", " ", ""],
-)
+# ── Local ANN index (services/ann_index.py) ──
+# RETRIEVAL_BACKEND=local hone pe retrieval Pinecone ki jagah shards se
+# hoti hai (jin threads ke saare documents ke shards maujood hain).
+# Shards default sirf tabhi bante hain — har shard float32 rerank copy
+# rakhta hai (int8 codes se ~4× bada), jo Pinecone backend pe bekaar
+# disk hai. Migration se pehle shards bharne ho toh ANN_INDEX_ENABLED=1.
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "pinecone")     # "pinecone" | "local"
+ANN_INDEX_ENABLED = os.getenv("ANN_INDEX_ENABLED", "1" if RETRIEVAL_BACKEND == "local" else "0") == "1"
+UPSERT_BATCH      = 100
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Cold-tier vector archives: {ARCHIVE_DIR}/{doc_id}.npz
+ARCHIVE_DIR = os.getenv("VECTOR_ARCHIVE_DIR", "vector_archive")
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+
+def archive_path_for(doc_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{doc_id}.npz")
+
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _purge_doc_artifacts(doc_id: str, file_path: str) -> None:
+    try:
+        pinecone_index.delete(filter={"doc_id": {"$eq": doc_id}})
+        print(f"🗑️  Pinecone vectors deleted for doc_id='{doc_id}'")
+    except Exception as e:
+        print(f"⚠️  Pinecone delete error: {e}")
+
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    if os.path.exists(archive_path_for(doc_id)):
+        os.remove(archive_path_for(doc_id))
+
+    ann_index.drop_shard(doc_id)
+
+
 # ─────────────────────────────────────────────
 # 1. Process & upload PDF
+#    Thread me multiple documents reh sakte hain — naya upload purane
+#    documents ko replace nahi karta.
 # ─────────────────────────────────────────────
-def process_pdf(thread_id: str, file_bytes: bytes, filename: str) -> dict:
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+
+
+def _ingest_file(thread_id: str, file_bytes: bytes, filename: str) -> dict:
+    """Save, chunk and index one PDF. SQLite row is written by the caller."""
     doc_id    = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{doc_id}_{filename}")
 
@@ -80,47 +129,12 @@ def process_pdf(thread_id: str, file_bytes: bytes, filename: str) -> dict:
         f.write(file_bytes)
 
     try:
-        # ✅ Purane vectors delete karo pehle
-        try:
-            conn = get_connection()
-            try:
-                old_docs = conn.execute(
-                    "SELECT doc_id FROM documents WHERE thread_id = ?",
-                    (thread_id,)
-                ).fetchall()
-            finally:
-                conn.close()
-
-            for old in old_docs:
-                pinecone_index.delete(filter={"doc_id": {"$eq": old["doc_id"]}})
-                print(f"🗑️ Old vectors deleted for doc_id: {old['doc_id']}")
-        except Exception as e:
-            print(f"⚠️ Could not delete old vectors: {e}")
-
-        loader = PyMuPDFLoader(file_path)
-        pages  = loader.load()
-        print(f"📄 Pages loaded: {len(pages)} from '{filename}'")
-
-        for i, page in enumerate(pages):
-            page.metadata["page_label"] = i + 1
-
-        # ✅ Page-based chunking — har page ek chunk
-        chunks = []
-        for page in pages:
-            content = page.page_content.strip()
-            if not content:
-                continue
-            if len(content) > 3000:
-                sub_chunks = text_splitter.split_documents([page])
-                chunks.extend(sub_chunks)
-            else:
-                chunks.append(page)  # poori page ek chunk
-
+        chunks = load_chunks(file_path)
         print(f"✂️  Chunks created: {len(chunks)}")
 
         if not chunks:
             os.remove(file_path)
-            return {"error": "PDF is empty or could not be read as text."}
+            return {"error": "PDF is empty or could not be read as text.", "filename": filename}
 
         for chunk in chunks:
             chunk.metadata.update({
@@ -128,122 +142,262 @@ def process_pdf(thread_id: str, file_bytes: bytes, filename: str) -> dict:
                 "thread_id": thread_id,
                 "filename":  filename,
                 "text":      chunk.page_content,
+                "indexed_at": int(time.time()),   # reconciler grace period
             })
 
         print(f"🔖 thread_id: '{thread_id}' | doc_id: '{doc_id}'")
-        vector_store.add_documents(chunks)
+        # ✅ Deterministic ids "{doc_id}#{n}" — prefix list/delete possible.
+        # Embeddings dispatcher se jaate hain, isliye concurrent uploads
+        # ke chunks ek hi batch me share hote hain. Vectors ek baar bante
+        # hain — Pinecone aur local ANN shard dono inhi se.
+        ids      = [f"{doc_id}#{i}" for i in range(len(chunks))]
+        vectors  = embedding_dispatcher.embed_documents([c.page_content for c in chunks])
+        metadata = [c.metadata for c in chunks]
+        for i in range(0, len(ids), UPSERT_BATCH):
+            pinecone_index.upsert(vectors=[
+                {"id": vid, "values": vec, "metadata": meta}
+                for vid, vec, meta in zip(
+                    ids[i:i + UPSERT_BATCH],
+                    vectors[i:i + UPSERT_BATCH],
+                    metadata[i:i + UPSERT_BATCH],
+                )
+            ])
         print(f"✅ {len(chunks)} chunks uploaded to Pinecone")
 
-        # ✅ SQLite update
-        conn = get_connection()
-        try:
-            conn.execute("DELETE FROM documents WHERE thread_id = ?", (thread_id,))
-            conn.execute(
-                """INSERT INTO documents
-                   (doc_id, thread_id, filename, file_path, chunk_count, uploaded_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (doc_id, thread_id, filename, file_path, len(chunks), _now()),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        if ANN_INDEX_ENABLED:
+            try:
+                ann_index.build_shard(doc_id, ids, vectors, metadata)
+            except Exception as e:
+                # Shard nahi bana — is thread ki retrieval Pinecone pe rahegi
+                print(f"⚠️  ANN shard build failed for doc_id='{doc_id}': {e}")
 
         return {
-            "doc_id":         doc_id,
-            "filename":       filename,
-            "chunks_indexed": len(chunks),
+            "doc_id":      doc_id,
+            "filename":    filename,
+            "file_path":   file_path,
+            "chunk_count": len(chunks),
         }
 
     except Exception as e:
         if os.path.exists(file_path):
             os.remove(file_path)
+        return {"error": f"Processing failed: {str(e)}", "filename": filename}
+
+
+def _insert_documents(thread_id: str, docs: List[dict]) -> None:
+    """Insert all `documents` rows of an upload in one transaction."""
+    now  = _now()
+    conn = get_connection()
+    try:
+        conn.executemany(
+            """INSERT INTO documents
+               (doc_id, thread_id, filename, file_path, chunk_count, uploaded_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (d["doc_id"], thread_id, d["filename"], d["file_path"], d["chunk_count"], now)
+                for d in docs
+            ],
+        )
+        refresh_document_count(conn, thread_id)
+        conn.execute(
+            "UPDATE threads SET last_activity_at = ? WHERE thread_id = ?",
+            (now, thread_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def process_pdf(thread_id: str, file_bytes: bytes, filename: str) -> dict:
+    result = _ingest_file(thread_id, file_bytes, filename)
+    if "error" in result:
+        return {"error": result["error"]}
+
+    try:
+        _insert_documents(thread_id, [result])
+    except Exception as e:
+        # Vectors index ho chuke — reconciler grace period ke baad collect karega
+        if os.path.exists(result["file_path"]):
+            os.remove(result["file_path"])
         return {"error": f"Processing failed: {str(e)}"}
 
+    # Summary + outline background me — upload response wait nahi karta
+    schedule_summary(result["doc_id"], result["file_path"])
+
+    return {
+        "doc_id":         result["doc_id"],
+        "filename":       result["filename"],
+        "chunks_indexed": result["chunk_count"],
+    }
+
 
 # ─────────────────────────────────────────────
-# 2. Retrieve relevant context for a query
+# 1b. Batch upload — files bounded pool pe parallel ingest
 # ─────────────────────────────────────────────
+def process_pdf_batch(thread_id: str, files: List[tuple[bytes, str]]) -> dict:
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest") as pool:
+        results = list(pool.map(
+            lambda f: _ingest_file(thread_id, f[0], f[1]),
+            files,
+        ))
+
+    indexed = [r for r in results if "error" not in r]
+    failed  = [{"filename": r["filename"], "error": r["error"]} for r in results if "error" in r]
+
+    if indexed:
+        try:
+            _insert_documents(thread_id, indexed)
+        except Exception as e:
+            for r in indexed:
+                if os.path.exists(r["file_path"]):
+                    os.remove(r["file_path"])
+            failed += [{"filename": r["filename"], "error": f"Processing failed: {str(e)}"} for r in indexed]
+            indexed = []
+
+    for r in indexed:
+        schedule_summary(r["doc_id"], r["file_path"])
+
+    return {
+        "documents": [
+            {"doc_id": r["doc_id"], "filename": r["filename"], "chunks_indexed": r["chunk_count"]}
+            for r in indexed
+        ],
+        "failed": failed,
+    }
+
+
 # ─────────────────────────────────────────────
-# 2. Retrieve relevant context for a query (UPDATED)
+# 2. Retrieve relevant context for a query
+#    Selection policy services/retrieval.py me hai
+#    Cold threads: caller pehle tiering_service.ensure_thread_hot() chalaye
 # ─────────────────────────────────────────────
 def retrieve_context(thread_id: str, query: str, k: int = 10) -> str:
-
-    # ── Step 1: Broad Query Handling (Enrichment) ─────────────────────
-    # If the user asks for a summary or overview, expand the query to find key points.
-    generic_keywords = ["summary", "summarize", "explain", "overview", "about",
-                        "describe", "tell me", "what is this", "50 words", "100 words",
-                        "content", "all content", "brief"]
-    
-    is_generic = any(kw in query.lower() for kw in generic_keywords)
-    if is_generic:
-        query = f"{query} introduction main content key points conclusion summary"
-        print(f"🔄 Query enriched for better retrieval")
+    query, is_generic = prepare_query(query)
 
     # ── Step 2: SQLite Metadata Retrieval ─────────────────────────────
-    conn = get_connection()
-    try:
-        rows = conn.execute(
-            "SELECT doc_id, chunk_count FROM documents WHERE thread_id = ?",
-            (thread_id,)
-        ).fetchall()
-        doc_ids = {r["doc_id"] for r in rows}
-        total_chunks = sum(r["chunk_count"] for r in rows)
-    finally:
-        conn.close()
-
-    if not doc_ids:
+    docs = get_documents_for_thread(thread_id)
+    if not docs:
         print("⚠️ No documents found for this thread.")
         return ""
-
-    # ── Step 3: Adaptive Fetch Strategy ───────────────────────────────
-    # For small PDFs or generic queries, fetch more chunks to ensure no context is missed.
-    if total_chunks <= 100 or is_generic:
-        fetch_k = min(total_chunks, 150)
-    else:
-        fetch_k = k * 3
+    total_chunks = sum(d["chunk_count"] for d in docs)
 
     # ── Step 4: Pinecone Search with Score ────────────────────────────
     try:
-        # Apply the thread_id filter directly at the Pinecone level for accuracy.
-        results_with_scores = vector_store.similarity_search_with_score(
-            query,
-            k=fetch_k,
-            filter={"thread_id": {"$eq": thread_id}}
-        )
+        # Query ek baar embed, phir har search call (thread / per-document filter) me reuse
+        query_vector = embedding_dispatcher.embed_query(query)
+        if _use_local_index(docs):
+            return _assemble_context(
+                _local_search(thread_id, docs, query_vector, is_generic, k), total_chunks, is_generic, k
+            )
+        results_with_scores = []
+        for search_filter, top_k in _search_plan(thread_id, docs, is_generic, k):
+            results_with_scores += vector_store.similarity_search_by_vector_with_score(
+                query_vector,
+                k=top_k,
+                filter=search_filter,
+            )
     except Exception as e:
         print(f"❌ Pinecone retrieval error: {e}")
         return ""
 
-    if not results_with_scores:
-        return ""
+    return _assemble_context(results_with_scores, total_chunks, is_generic, k)
+
+
+def _use_local_index(docs: List[dict]) -> bool:
+    return RETRIEVAL_BACKEND == "local" and all(ann_index.has_shard(d["doc_id"]) for d in docs)
+
+
+def _local_search(thread_id: str, docs: List[dict], query_vector, is_generic: bool, k: int) -> list:
+    """Same search plan as Pinecone, served from the local ANN shards."""
+    results_with_scores = []
+    for search_filter, top_k in _search_plan(thread_id, docs, is_generic, k):
+        doc_ids = [
+            d["doc_id"] for d in docs
+            if "doc_id" not in search_filter or d["doc_id"] == search_filter["doc_id"]["$eq"]
+        ]
+        for _, metadata, score in ann_index.search(doc_ids, query_vector, top_k):
+            metadata = dict(metadata)
+            text     = metadata.pop("text", "")
+            results_with_scores.append((Document(page_content=text, metadata=metadata), score))
+    return results_with_scores
+
+
+# ─────────────────────────────────────────────
+# 2b. Async retrieval — event loop kabhi block nahi hota
+#     SQLite → worker thread, embedding → dispatcher future,
+#     Pinecone → asyncio index client.
+# ─────────────────────────────────────────────
+_async_index = None
+
+
+def _get_async_index():
+    global _async_index
+    if _async_index is None:
+        _async_index = pc.IndexAsyncio(host=PINECONE_HOST)
+    return _async_index
+
+
+async def aclose_vector_client() -> None:
+    global _async_index
+    if _async_index is not None:
+        await _async_index.close()
+        _async_index = None
+
+
+async def aembed_query_safe(query: str):
+    try:
+        return await embedding_dispatcher.aembed_query(query)
+    except Exception as e:
+        print(f"❌ Query embedding error: {e}")
+        return None
+
+
+async def asearch_passages(
+    thread_id: str,
+    docs: List[dict],
+    query_vector,
+    is_generic: bool,
+    k: int = 10,
+) -> List[dict]:
+    """Pinecone search + passage selection for an already-embedded query."""
+    if not docs:
+        print("⚠️ No documents found for this thread.")
+        return []
+    if query_vector is None:
+        return []
+
+    total_chunks = sum(d["chunk_count"] for d in docs)
+    if _use_local_index(docs):
+        results_with_scores = await asyncio.to_thread(
+            _local_search, thread_id, docs, query_vector, is_generic, k
+        )
+        return select_passages(results_with_scores, total_chunks, is_generic, k)
+
+    index = _get_async_index()
+    try:
+        # Per-document searches concurrently (single doc → ek hi call)
+        responses = await asyncio.gather(*[
+            index.query(
+                vector=query_vector,
+                top_k=top_k,
+                filter=search_filter,
+                include_metadata=True,
+            )
+            for search_filter, top_k in _search_plan(thread_id, docs, is_generic, k)
+        ])
+    except Exception as e:
+        print(f"❌ Pinecone retrieval error: {e}")
+        return []
+
+    results_with_scores = []
+    for response in responses:
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text     = metadata.pop("text", "")
+            results_with_scores.append((Document(page_content=text, metadata=metadata), match.score))
+
+    return select_passages(results_with_scores, total_chunks, is_generic, k)
 
-    # ── Step 5: Sorting & Filtering Logic ─────────────────────────────
-    # Sort by page number to maintain logical flow for the LLM.
-    results_with_scores.sort(key=lambda x: x[0].metadata.get("page_label", 0))
-
-    # Threshold Adjustment: 
-    # For OpenAI embeddings, 0.70 (Generic) and 0.75 (Specific) provide a good balance.
-    THRESHOLD = 0.70 if is_generic else 0.75
-    
-    parts = []
-    for doc, score in results_with_scores:
-        # Skip filtering for very small PDFs to provide maximum context.
-        # Apply threshold for larger documents to reduce noise.
-        if total_chunks <= 50 or score >= THRESHOLD:
-            page = doc.metadata.get("page_label", "?")
-            content = doc.page_content.strip()
-            parts.append(f"[Page {page}]: {content}")
-
-    # ── Step 6: Fallback (Avoid "Information Not Found") ──────────────
-    # If the threshold was too strict and removed all chunks, use the top 5 results as a backup.
-    if not parts and results_with_scores:
-        print("⚠️ Using fallback: Threshold was too strict.")
-        for doc, _ in results_with_scores[:5]:
-            page = doc.metadata.get("page_label", "?")
-            parts.append(f"[Page {page}]: {doc.page_content.strip()}")
-
-    print(f"✅ Sent {len(parts)} chunks to LLM.")
-    return "\n\n---\n\n".join(parts)
 
 # ─────────────────────────────────────────────
 # 3. List documents for a thread
@@ -252,7 +406,7 @@ def get_documents_for_thread(thread_id: str) -> List[dict]:
     conn = get_connection()
     try:
         rows = conn.execute(
-            """SELECT doc_id, thread_id, filename, file_path, chunk_count, uploaded_at
+            """SELECT doc_id, thread_id, filename, file_path, chunk_count, uploaded_at, tier
                FROM documents WHERE thread_id = ? ORDER BY uploaded_at ASC""",
             (thread_id,)
         ).fetchall()
@@ -276,17 +430,21 @@ def delete_document(doc_id: str) -> dict:
 
         meta = dict(row)
         conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        refresh_document_count(conn, meta["thread_id"])
         conn.commit()
     finally:
         conn.close()
 
-    try:
-        pinecone_index.delete(filter={"doc_id": {"$eq": doc_id}})
-        print(f"🗑️  Pinecone vectors deleted for doc_id='{doc_id}'")
-    except Exception as e:
-        print(f"⚠️  Pinecone delete error: {e}")
+    _purge_doc_artifacts(doc_id, meta["file_path"])
 
-    if os.path.exists(meta["file_path"]):
-        os.remove(meta["file_path"])
+    return {"deleted": doc_id, "filename": meta["filename"]}
 
-    return {"deleted": doc_id, "filename": meta["filename"]}
\ No newline at end of file
+
+# ─────────────────────────────────────────────
+# 5. Purge vectors + files of a thread (before thread delete)
+# ─────────────────────────────────────────────
+def purge_thread_documents(thread_id: str) -> int:
+    docs = get_documents_for_thread(thread_id)
+    for doc in docs:
+        _purge_doc_artifacts(doc["doc_id"], doc["file_path"])
+    return len(docs)
\ No newline at end of file
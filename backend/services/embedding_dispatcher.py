@@ -0,0 +1,177 @@
+# services/embedding_dispatcher.py
+# ─────────────────────────────────────────────
+# Shared micro-batching embedding dispatcher
+#   Saare in-flight uploads + queries ke texts kuch milliseconds tak
+#   collect karke ek batched embedding call banata hai, phir results
+#   callers ko scatter karta hai. Query texts ki priority bulk
+#   ingestion se upar hai — query kabhi bulk batch ke peeche nahi rukti:
+#   bulk batches dispatcher ki queue me tab tak rehte hain jab tak
+#   worker free na ho, aur ek worker slot sirf queries ke liye reserved.
+#
+#   LangChain `Embeddings` interface implement karta hai, isliye
+#   PineconeVectorStore ko bina change ke de sakte hain.
+# ─────────────────────────────────────────────
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from services import metrics
+
+PRIORITY_QUERY = 0
+PRIORITY_BULK  = 1
+
+BATCH_MAX_WAIT_MS = 8          # batch window
+BATCH_MAX_TEXTS   = 256        # texts per upstream call
+BATCH_MAX_TOKENS  = 200_000    # approx tokens per upstream call (OpenAI cap 300k)
+DISPATCH_WORKERS  = 4          # parallel upstream calls
+QUERY_RESERVED    = 1          # slots jo bulk kabhi nahi leta
+
+
+def _approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class _Request:
+    def __init__(self, texts: List[str]):
+        self.results: List = [None] * len(texts)
+        self.pending = len(texts)
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+
+    def fill(self, idx: int, vector: List[float]) -> None:
+        with self.lock:
+            self.results[idx] = vector
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            try:
+                self.future.set_result(self.results)
+            except InvalidStateError:
+                pass        # caller ne cancel kar diya (e.g. _prepare_turn ka embed_task)
+
+    def fail(self, exc: BaseException) -> None:
+        try:
+            self.future.set_exception(exc)
+        except InvalidStateError:
+            pass            # pehle hi cancel / fail ho chuka
+
+
+class EmbeddingDispatcher(Embeddings):
+    def __init__(self, inner: Embeddings):
+        self._inner  = inner
+        self._queues = {PRIORITY_QUERY: deque(), PRIORITY_BULK: deque()}
+        self._cond   = threading.Condition()
+        self._busy   = 0           # in-flight upstream calls
+        self._pool   = ThreadPoolExecutor(max_workers=DISPATCH_WORKERS,
+                                          thread_name_prefix="embed")
+        self._worker = threading.Thread(target=self._run, name="embed-dispatcher", daemon=True)
+        self._worker.start()
+
+    # ── Submit ────────────────────────────────
+    def submit(self, texts: List[str], priority: int = PRIORITY_BULK) -> Future:
+        req = _Request(texts)
+        if not texts:
+            req.future.set_result([])
+            return req.future
+        with self._cond:
+            q = self._queues[priority]
+            for i, text in enumerate(texts):
+                q.append((req, i, text))
+            self._cond.notify()
+        return req.future
+
+    # ── LangChain Embeddings interface ────────
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(list(texts), PRIORITY_BULK).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text], PRIORITY_QUERY).result()[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.wrap_future(self.submit(list(texts), PRIORITY_BULK))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await asyncio.wrap_future(self.submit([text], PRIORITY_QUERY)))[0]
+
+    # ── Batching loop ─────────────────────────
+    def _queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _take_batch(self) -> tuple[list, str]:
+        """Drain one queue up to the caps, queries first. Caller holds the lock."""
+        batch, tokens = [], 0
+        priority = PRIORITY_QUERY if self._queues[PRIORITY_QUERY] else PRIORITY_BULK
+        q = self._queues[priority]
+        while q and len(batch) < BATCH_MAX_TEXTS:
+            cost = _approx_tokens(q[0][2])
+            if batch and tokens + cost > BATCH_MAX_TOKENS:
+                break
+            batch.append(q.popleft())
+            tokens += cost
+        return batch, "query" if priority == PRIORITY_QUERY else "bulk"
+
+    def _can_dispatch(self) -> bool:
+        if self._queues[PRIORITY_QUERY]:
+            return self._busy < DISPATCH_WORKERS
+        return bool(self._queues[PRIORITY_BULK]) and self._busy < DISPATCH_WORKERS - QUERY_RESERVED
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                # Free slot ka wait — tab tak bulk texts yahin queue me,
+                # taaki baad me aayi query unke aage nikal sake
+                while not self._can_dispatch():
+                    self._cond.wait()
+
+                # Query aayi hai toh wait mat karo; bulk ke liye window bharne do
+                if not self._queues[PRIORITY_QUERY]:
+                    deadline = time.monotonic() + BATCH_MAX_WAIT_MS / 1000
+                    while self._queued() < BATCH_MAX_TEXTS:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._queues[PRIORITY_QUERY]:
+                            break
+                        self._cond.wait(remaining)
+
+                batch, kind = self._take_batch()
+                self._busy += 1
+
+            self._pool.submit(self._dispatch, batch, kind)
+
+    def _dispatch(self, batch: list, kind: str) -> None:
+        try:
+            self._embed_batch(batch, kind)
+        finally:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+
+    def _embed_batch(self, batch: list, kind: str) -> None:
+        texts = [text for _, _, text in batch]
+
+        metrics.inc("embedding_batches_total", help="Upstream embedding calls", kind=kind)
+        metrics.inc("embedding_texts_total", len(texts), help="Texts embedded", kind=kind)
+        fill = len(texts) / BATCH_MAX_TEXTS
+        metrics.set_gauge("embedding_batch_fill_ratio", fill,
+                          help="Texts in last upstream batch / BATCH_MAX_TEXTS")
+        metrics.inc("embedding_batch_fill_ratio_sum", fill,
+                    help="Sum of fill ratios; divide by embedding_batches_total for the mean")
+
+        try:
+            vectors = self._inner.embed_documents(texts)
+            if len(vectors) != len(texts):
+                # zip chupchaap extra texts chhod deta — woh callers hamesha wait karte
+                raise ValueError(f"Embedding upstream returned {len(vectors)} vectors for {len(texts)} texts")
+        except Exception as e:
+            metrics.inc("embedding_errors_total", help="Failed upstream embedding calls")
+            for req, _, _ in batch:
+                req.fail(e)
+            return
+
+        for (req, idx, _), vector in zip(batch, vectors):
+            req.fill(idx, vector)
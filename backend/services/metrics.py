@@ -0,0 +1,57 @@
+# services/metrics.py
+# ─────────────────────────────────────────────
+# Tiny in-process metrics registry
+#   Counters + gauges, Prometheus text format me /metrics pe expose.
+#   Thread-safe — executor threads se bhi update hote hain.
+# ─────────────────────────────────────────────
+
+import threading
+from typing import Dict, Tuple
+
+_lock     = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_gauges:   Dict[Tuple[str, Tuple], float] = {}
+_help:     Dict[str, Tuple[str, str]]     = {}   # name → (type, help)
+
+
+def _key(name: str, labels: dict) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name: str, value: float = 1.0, help: str = "", **labels) -> None:
+    with _lock:
+        _help.setdefault(name, ("counter", help))
+        k = _key(name, labels)
+        _counters[k] = _counters.get(k, 0.0) + value
+
+
+def set_gauge(name: str, value: float, help: str = "", **labels) -> None:
+    with _lock:
+        _help.setdefault(name, ("gauge", help))
+        _gauges[_key(name, labels)] = float(value)
+
+
+def snapshot() -> dict:
+    with _lock:
+        out = {}
+        for (name, labels), value in {**_counters, **_gauges}.items():
+            label_str = ",".join(f"{k}={v}" for k, v in labels)
+            out[f"{name}{{{label_str}}}" if label_str else name] = value
+        return out
+
+
+def render_prometheus() -> str:
+    with _lock:
+        lines = []
+        series = sorted({**_counters, **_gauges}.items())
+        seen = set()
+        for (name, labels), value in series:
+            if name not in seen:
+                kind, text = _help.get(name, ("gauge", ""))
+                if text:
+                    lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                seen.add(name)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+        return "\n".join(lines) + "\n"
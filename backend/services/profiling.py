@@ -0,0 +1,268 @@
+# services/profiling.py
+# ─────────────────────────────────────────────
+# Opt-in per-request profiling
+#   Enable karne ke do tareeke:
+#     1. Header  `X-Profile: <PROFILE_ADMIN_TOKEN>`
+#     2. Sampling `PROFILE_SAMPLE_RATE` (0.0 – 1.0) on PROFILED_PATHS
+#   Capture:
+#     - statistical stack sampler (saare threads — event loop + executors)
+#       → folded stacks, flamegraph.pl / speedscope / inferno direct padh lete hain
+#     - tracemalloc peak + top allocations
+#   Results: profiles/ me bounded ring (PROFILE_RING_SIZE), admin
+#   endpoints se serve hote hain.
+#
+#   Ek time pe sirf ek request profile hoti hai — tracemalloc process-wide
+#   hai, concurrent sessions ek doosre ke numbers bigaad dete.
+# ─────────────────────────────────────────────
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+PROFILE_ADMIN_TOKEN  = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE  = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR          = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_RING_SIZE    = int(os.getenv("PROFILE_RING_SIZE", "50"))
+SAMPLE_INTERVAL_MS   = 5
+TOP_ALLOCATIONS      = 20
+TRACEMALLOC_FRAMES   = 10
+
+PROFILED_PATHS = ("/chat/stream", "/chat/send", "/documents/upload")
+
+_session_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────
+# 1. Stack sampler
+# ─────────────────────────────────────────────
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, interval_ms: int = SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own   = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.counts.most_common()) + "\n"
+
+
+# ─────────────────────────────────────────────
+# 2. Profile session — sampler + tracemalloc
+# ─────────────────────────────────────────────
+class ProfileSession:
+    def __init__(self, method: str, path: str, reason: str):
+        self.profile_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        self.method  = method
+        self.path    = path
+        self.reason  = reason
+        self.sampler = StackSampler()
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self, status_code: Optional[int]) -> dict:
+        self.sampler.stop()
+        duration_ms = (time.perf_counter() - self._t0) * 1000
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        top = [
+            {
+                "location": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                "size_kb":  round(s.size / 1024, 1),
+                "count":    s.count,
+            }
+            for s in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+
+        meta = {
+            "profile_id":       self.profile_id,
+            "method":           self.method,
+            "path":             self.path,
+            "reason":           self.reason,
+            "status_code":      status_code,
+            "duration_ms":      round(duration_ms, 1),
+            "samples":          self.sampler.samples,
+            "sample_interval_ms": SAMPLE_INTERVAL_MS,
+            "mem_start_kb":     round(self._mem_start / 1024, 1),
+            "mem_end_kb":       round(current / 1024, 1),
+            "mem_peak_kb":      round(peak / 1024, 1),
+            "top_allocations":  top,
+            "created_at":       time.time(),
+        }
+        _store(meta, self.sampler.folded())
+        print(f"🔬 Profile {self.profile_id}: {self.path} {meta['duration_ms']} ms, peak {meta['mem_peak_kb']} KB")
+        return meta
+
+
+# ─────────────────────────────────────────────
+# 3. Bounded on-disk ring
+# ─────────────────────────────────────────────
+def _path(profile_id: str, ext: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def _store(meta: dict, folded: str) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(_path(meta["profile_id"], "folded"), "w") as f:
+        f.write(folded)
+    with open(_path(meta["profile_id"], "json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Ring — sabse purane profiles hatao
+    metas = sorted(
+        (e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".json")),
+        key=lambda e: e.stat().st_mtime,
+    )
+    for entry in metas[:max(len(metas) - PROFILE_RING_SIZE, 0)]:
+        profile_id = entry.name[:-len(".json")]
+        for ext in ("json", "folded"):
+            if os.path.exists(_path(profile_id, ext)):
+                os.remove(_path(profile_id, ext))
+
+
+def list_profiles() -> list[dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".json"):
+            with open(entry.path) as f:
+                meta = json.load(f)
+            meta.pop("top_allocations", None)
+            out.append(meta)
+    return sorted(out, key=lambda m: m["created_at"], reverse=True)
+
+
+def _safe_id(profile_id: str) -> bool:
+    return bool(profile_id) and all(c.isalnum() or c == "-" for c in profile_id)
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    if not _safe_id(profile_id) or not os.path.exists(_path(profile_id, "json")):
+        return None
+    with open(_path(profile_id, "json")) as f:
+        return json.load(f)
+
+
+def load_folded(profile_id: str) -> Optional[str]:
+    if not _safe_id(profile_id) or not os.path.exists(_path(profile_id, "folded")):
+        return None
+    with open(_path(profile_id, "folded")) as f:
+        return f.read()
+
+
+def is_admin(token: Optional[str]) -> bool:
+    # Constant-time compare — token timing se guess na ho
+    return bool(PROFILE_ADMIN_TOKEN) and bool(token) and hmac.compare_digest(
+        token.encode(), PROFILE_ADMIN_TOKEN.encode()
+    )
+
+
+# ─────────────────────────────────────────────
+# 4. ASGI middleware
+#    Pure ASGI (BaseHTTPMiddleware nahi) — streaming body ke last chunk
+#    tak profile chalti hai, sirf headers tak nahi.
+# ─────────────────────────────────────────────
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _reason(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or [])
+        token   = headers.get(b"x-profile", b"").decode()
+        if token and is_admin(token):
+            return "header"
+        if PROFILE_SAMPLE_RATE > 0 and scope["path"].startswith(PROFILED_PATHS):
+            if random.random() < PROFILE_SAMPLE_RATE:
+                return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        reason = self._reason(scope)
+        if reason is None or not _session_lock.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        session = ProfileSession(scope["method"], scope["path"], reason)
+        status  = {"code": None}
+        stopped = False
+
+        async def finish():
+            nonlocal stopped
+            if not stopped:
+                stopped = True
+                try:
+                    # Sampler join + tracemalloc snapshot + file writes — event loop pe nahi
+                    await asyncio.to_thread(session.stop, status["code"])
+                finally:
+                    _session_lock.release()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", session.profile_id.encode())
+                ]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                await finish()
+
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await finish()
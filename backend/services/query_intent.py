@@ -0,0 +1,67 @@
+# services/query_intent.py
+# ─────────────────────────────────────────────
+# Whole-document question detection
+#   Sirf poore document ke baare me sawaal ("summarize this paper",
+#   "tell me about this", "is there an abstract?") precomputed summaries
+#   se answer hote hain. Pattern poore query pe anchored hain — page /
+#   section / table / figure wale specific sawaal ("summary of page 7",
+#   "overview of the loss in section 4") retrieval pe hi jaate hain.
+# ─────────────────────────────────────────────
+
+import re
+
+SECTION_NAMES = (
+    r"(abstract|introduction|background|related work|literature review|method(?:s|ology)?|"
+    r"approach|experiments?|results?|discussion|evaluation|conclusions?|future work|"
+    r"acknowledg(?:e)?ments?|references|bibliography|appendix|summary)"
+)
+KNOWN_SECTIONS = re.compile(r"^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*" + SECTION_NAMES + r"\b", re.IGNORECASE)
+
+# "the paper", "this pdf", "my documents", ... — document noun zaroori.
+# Bare "it" / "that" pichhle answer ke follow-up hote hain ("explain
+# that", "what is it"), document ke baare me nahi.
+_DOC_NOUN = (
+    r"(?:(?:the|this|that|my|these|those|uploaded|the uploaded) "
+    r"(?:pdfs?|documents?|docs?|papers?|files?|articles?|reports?))"
+)
+# Bare "this" sirf jab woh poora object ho ("tell me about this", "what is this")
+_DOC = r"(?:this|" + _DOC_NOUN + r")"
+_POLITE = r"(?:(?:please|can you|could you|would you|pls) )*"
+_LENGTH = r"(?: (?:in|within|under) (?:about )?\d+ (?:words|sentences|lines|points|bullets))?"
+_BRIEF  = r"(?:(?:a|an) )?(?:(?:brief|short|quick|high[- ]level|general) )?"
+
+SUMMARY_QUERY = re.compile(
+    r"^" + _POLITE + r"(?:"
+    # summarize / summarise this paper (in 50 words)
+    r"(?:summari[sz]e|sum up|tl;?dr)(?: " + _DOC + r")?" + _LENGTH + r"|"
+    # (give me) a brief summary / overview (of this pdf)
+    r"(?:(?:give|show|write|provide)(?: me)? )?" + _BRIEF +
+    r"(?:summary|overview|tl;?dr|gist)(?: (?:of|for) " + _DOC + r")?" + _LENGTH + r"|"
+    # what is this (paper) (about)
+    r"(?:what is|what's|whats) " + _DOC + r"(?: about)?|"
+    # tell me about this / describe the document / explain the paper
+    r"(?:tell me (?:about|more about)|describe) " + _DOC + _LENGTH + r"|"
+    r"explain " + _DOC_NOUN + _LENGTH +
+    r")(?: please)?$",
+    re.IGNORECASE,
+)
+
+# Sirf short presence questions — "is there an abstract?", "does it have a conclusion section"
+SECTION_QUERY = re.compile(
+    r"^(?:is there|are there|does (?:it|this|" + _DOC_NOUN + r") (?:have|contain|include))"
+    r" (?:an? |the |any )?" + SECTION_NAMES + r"(?: section)?$",
+    re.IGNORECASE,
+)
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip()
+
+
+def is_section_query(query: str) -> bool:
+    return bool(SECTION_QUERY.match(_normalize(query)))
+
+
+def is_summary_query(query: str) -> bool:
+    q = _normalize(query)
+    return bool(SUMMARY_QUERY.match(q) or SECTION_QUERY.match(q))
@@ -0,0 +1,268 @@
+# services/reconcile_service.py
+# ─────────────────────────────────────────────
+# Orphan reconciler
+#   `documents` table ko source of truth maan kar Pinecone vectors aur
+#   uploads/ files se diff karta hai. Jo vector / file kisi existing
+#   doc_id se match nahi karta, woh orphan hai → batch me delete.
+#   Incremental: har pass kuch pages process karta hai aur Pinecone
+#   pagination token ko maintenance_state me checkpoint karta hai.
+# ─────────────────────────────────────────────
+
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from db.sqlite_conn import get_connection
+from services.document_service import pinecone_index, UPLOAD_DIR
+from services import ann_index
+
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("RECONCILE_INTERVAL_SECONDS", "3600"))   # 0 = disabled
+RECONCILE_PAGE_SIZE        = 100     # Pinecone list/fetch page
+RECONCILE_PAGES_PER_PASS   = 20      # ek pass me max pages
+RECONCILE_DELETE_BATCH     = 100     # ids per delete call
+RECONCILE_DELETES_PER_SEC  = 2.0     # rate limit (delete calls / sec)
+RECONCILE_GRACE_SECONDS    = 3600    # in-flight uploads ko mat chhuo
+
+STATE_KEY = "reconcile"
+
+# Ek time pe ek hi pass — background loop aur POST /documents/reconcile
+# same pagination checkpoint padhte / likhte hain
+_pass_lock = threading.Lock()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ── Checkpoint state ──────────────────────────
+def _load_state() -> dict:
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT value FROM maintenance_state WHERE key = ?", (STATE_KEY,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+    state = json.loads(row["value"]) if row else {}
+    state.setdefault("pagination_token", None)
+    state.setdefault("totals", {})
+    for key in ("vectors_deleted", "files_deleted", "bytes_reclaimed", "ann_shards_deleted"):
+        state["totals"].setdefault(key, 0)
+    return state
+
+
+def _save_state(state: dict) -> None:
+    conn = get_connection()
+    try:
+        conn.execute(
+            """INSERT INTO maintenance_state (key, value, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                              updated_at = excluded.updated_at""",
+            (STATE_KEY, json.dumps(state), _now()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _known_doc_ids() -> set[str]:
+    conn = get_connection()
+    try:
+        return {r["doc_id"] for r in conn.execute("SELECT doc_id FROM documents")}
+    finally:
+        conn.close()
+
+
+def _known_file_paths() -> set[str]:
+    conn = get_connection()
+    try:
+        return {
+            os.path.normpath(r["file_path"])
+            for r in conn.execute("SELECT file_path FROM documents")
+        }
+    finally:
+        conn.close()
+
+
+# ── Rate-limited batch delete ─────────────────
+def _delete_ids(ids: list[str]) -> int:
+    deleted  = 0
+    interval = 1.0 / RECONCILE_DELETES_PER_SEC
+    for i in range(0, len(ids), RECONCILE_DELETE_BATCH):
+        batch = ids[i:i + RECONCILE_DELETE_BATCH]
+        try:
+            pinecone_index.delete(ids=batch)
+            deleted += len(batch)
+        except Exception as e:
+            print(f"⚠️  Reconcile delete error: {e}")
+        time.sleep(interval)
+    return deleted
+
+
+def _is_orphan_vector(metadata: Optional[dict], known: set[str], cutoff: float) -> bool:
+    metadata = metadata or {}
+    doc_id   = metadata.get("doc_id")
+    if doc_id in known:
+        return False
+    # Naye vectors jinki SQLite row abhi commit nahi hui — skip
+    indexed_at = metadata.get("indexed_at")
+    return indexed_at is None or float(indexed_at) < cutoff
+
+
+# ─────────────────────────────────────────────
+# 1. Vector sweep (incremental)
+# ─────────────────────────────────────────────
+def _sweep_vectors(state: dict, max_pages: int) -> dict:
+    known   = _known_doc_ids()
+    cutoff  = time.time() - RECONCILE_GRACE_SECONDS
+    scanned = 0
+    deleted = 0
+    token   = state["pagination_token"]
+
+    for _ in range(max_pages):
+        page = pinecone_index.list_paginated(
+            limit=RECONCILE_PAGE_SIZE,
+            pagination_token=token,
+        )
+        ids = [v.id for v in (page.vectors or [])]
+        scanned += len(ids)
+
+        if ids:
+            fetched = pinecone_index.fetch(ids=ids).vectors
+            orphans = [
+                vid for vid, vec in fetched.items()
+                if _is_orphan_vector(vec.metadata, known, cutoff)
+            ]
+            if orphans:
+                deleted += _delete_ids(orphans)
+
+        token = page.pagination.next if page.pagination else None
+        state["pagination_token"] = token
+        _save_state(state)           # checkpoint after every page
+
+        if not token:
+            break
+
+    return {"vectors_scanned": scanned, "vectors_deleted": deleted, "sweep_complete": token is None}
+
+
+# ─────────────────────────────────────────────
+# 2. uploads/ sweep
+# ─────────────────────────────────────────────
+def _sweep_uploads() -> dict:
+    known  = _known_file_paths()
+    cutoff = time.time() - RECONCILE_GRACE_SECONDS
+    files_deleted   = 0
+    bytes_reclaimed = 0
+
+    if not os.path.isdir(UPLOAD_DIR):
+        return {"files_deleted": 0, "bytes_reclaimed": 0}
+
+    for entry in os.scandir(UPLOAD_DIR):
+        if not entry.is_file():
+            continue
+        path = os.path.normpath(entry.path)
+        if path in known:
+            continue
+        try:
+            stat = entry.stat()
+            if stat.st_mtime >= cutoff:
+                continue
+            os.remove(path)
+            files_deleted   += 1
+            bytes_reclaimed += stat.st_size
+        except OSError as e:
+            print(f"⚠️  Reconcile file error: {e}")
+
+    return {"files_deleted": files_deleted, "bytes_reclaimed": bytes_reclaimed}
+
+
+def _sweep_ann_shards() -> int:
+    """Drop local ANN shards whose document no longer exists (e.g. failed uploads)."""
+    if not os.path.isdir(ann_index.ANN_DIR):
+        return 0
+    known  = _known_doc_ids()
+    cutoff = time.time() - RECONCILE_GRACE_SECONDS
+    dropped = 0
+    for entry in os.scandir(ann_index.ANN_DIR):
+        if not entry.is_dir() or entry.name in known:
+            continue
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+        except OSError:
+            continue
+        ann_index.drop_shard(entry.name)
+        dropped += 1
+    return dropped
+
+
+# ─────────────────────────────────────────────
+# 3. One reconcile pass
+# ─────────────────────────────────────────────
+def run_reconcile_pass(max_pages: int = RECONCILE_PAGES_PER_PASS) -> dict:
+    if not _pass_lock.acquire(blocking=False):
+        return {"error": "A reconcile pass is already running."}
+    try:
+        return _run_pass(max_pages)
+    finally:
+        _pass_lock.release()
+
+
+def _run_pass(max_pages: int) -> dict:
+    state   = _load_state()
+    started = time.monotonic()
+
+    report = _sweep_vectors(state, max_pages)
+
+    # uploads/ sweep ek baar per full vector cycle
+    files = _sweep_uploads() if report["sweep_complete"] else {"files_deleted": 0, "bytes_reclaimed": 0}
+    report.update(files)
+    report["ann_shards_deleted"] = _sweep_ann_shards() if report["sweep_complete"] else 0
+    report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    report["finished_at"] = _now()
+
+    totals = state["totals"]
+    totals["vectors_deleted"]    += report["vectors_deleted"]
+    totals["files_deleted"]      += report["files_deleted"]
+    totals["bytes_reclaimed"]    += report["bytes_reclaimed"]
+    totals["ann_shards_deleted"] += report["ann_shards_deleted"]
+    state["last_report"] = report
+    _save_state(state)
+
+    print(
+        f"🧹 Reconcile: {report['vectors_deleted']} vectors, "
+        f"{report['files_deleted']} files ({report['bytes_reclaimed']} bytes) reclaimed"
+    )
+    return {**report, "totals": totals}
+
+
+def get_reconcile_report() -> dict:
+    state = _load_state()
+    return {
+        "last_report":      state.get("last_report"),
+        "totals":           state["totals"],
+        "sweep_in_progress": state["pagination_token"] is not None,
+    }
+
+
+# ─────────────────────────────────────────────
+# 4. Background loop (started from app lifespan)
+# ─────────────────────────────────────────────
+async def reconcile_loop() -> None:
+    if RECONCILE_INTERVAL_SECONDS <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+        try:
+            report = await loop.run_in_executor(None, run_reconcile_pass)
+            if "error" in report:
+                print(f"⚠️  Reconcile pass skipped: {report['error']}")
+        except Exception as e:
+            print(f"⚠️  Reconcile pass failed: {e}")
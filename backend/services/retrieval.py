@@ -0,0 +1,184 @@
+# services/retrieval.py
+# ─────────────────────────────────────────────
+# Retrieval policy — chunking, query enrichment, fetch_k, thresholds,
+# passage selection. Koi network / Pinecone import nahi, isliye
+# document_service aur offline eval harness (eval_retrieval.py) dono
+# exactly yahi code chalate hain.
+# ─────────────────────────────────────────────
+
+from typing import List
+
+from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from services import metrics
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# ── Chunking — page-based ─────────────────────
+# Agar page 3000 chars se badi ho toh split, warna ek page = ek chunk
+CHUNK_SIZE    = 3000
+CHUNK_OVERLAP = 100
+
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+    separators=["\n\n", "\n", " ", ""],
+)
+
+# ── Selection thresholds ──────────────────────
+GENERIC_THRESHOLD       = 0.70
+SPECIFIC_THRESHOLD      = 0.75
+NO_THRESHOLD_MAX_CHUNKS = 50       # chhote PDFs pe threshold skip
+
+
+def load_chunks(file_path: str) -> List[Document]:
+    """Load a PDF and split it the way ingestion does (page_label is 1-based)."""
+    pages = PyMuPDFLoader(file_path).load()
+    print(f"📄 Pages loaded: {len(pages)} from '{file_path}'")
+
+    for i, page in enumerate(pages):
+        page.metadata["page_label"] = i + 1
+
+    # ✅ Page-based chunking — har page ek chunk
+    chunks = []
+    for page in pages:
+        content = page.page_content.strip()
+        if not content:
+            continue
+        if len(content) > CHUNK_SIZE:
+            chunks.extend(text_splitter.split_documents([page]))
+        else:
+            chunks.append(page)  # poori page ek chunk
+    return chunks
+
+
+# ── Query enrichment ──────────────────────────
+GENERIC_KEYWORDS = ["summary", "summarize", "explain", "overview", "about",
+                    "describe", "tell me", "what is this", "50 words", "100 words",
+                    "content", "all content", "brief"]
+
+
+def prepare_query(query: str) -> tuple[str, bool]:
+    # ── Step 1: Broad Query Handling (Enrichment) ─────────────────────
+    # If the user asks for a summary or overview, expand the query to find key points.
+    is_generic = any(kw in query.lower() for kw in GENERIC_KEYWORDS)
+    if is_generic:
+        query = f"{query} introduction main content key points conclusion summary"
+        print(f"🔄 Query enriched for better retrieval")
+    return query, is_generic
+
+
+def _fetch_k(total_chunks: int, is_generic: bool, k: int) -> int:
+    # ── Step 3: Adaptive Fetch Strategy ───────────────────────────────
+    # For small PDFs or generic queries, fetch more chunks to ensure no context is missed.
+    if total_chunks <= 100 or is_generic:
+        return max(min(total_chunks, 150), 1)
+    return k * 3
+
+
+def _search_plan(thread_id: str, docs: List[dict], is_generic: bool, k: int) -> List[tuple[dict, int]]:
+    """(Pinecone filter, top_k) per search call."""
+    if len(docs) == 1:
+        total_chunks = docs[0]["chunk_count"]
+        return [({"thread_id": {"$eq": thread_id}}, _fetch_k(total_chunks, is_generic, k))]
+
+    # Multi-document thread: har document ka apna quota, taaki bada PDF
+    # chhote PDFs ko candidate list se bahar na kar de
+    return [
+        ({"doc_id": {"$eq": d["doc_id"]}}, _fetch_k(d["chunk_count"], is_generic, k))
+        for d in docs
+    ]
+
+
+def _normalize_per_document(results_with_scores: list) -> List[float]:
+    """Min-max each document's scores to [0, 1] so documents rank on equal footing."""
+    by_doc: dict = {}
+    for doc, score in results_with_scores:
+        by_doc.setdefault(doc.metadata.get("doc_id"), []).append(score)
+    bounds = {d: (min(s), max(s)) for d, s in by_doc.items()}
+
+    normalized = []
+    for doc, score in results_with_scores:
+        lo, hi = bounds[doc.metadata.get("doc_id")]
+        normalized.append((score - lo) / (hi - lo) if hi > lo else 1.0)
+    return normalized
+
+
+def _label(doc: Document, multi_doc: bool) -> str:
+    page = doc.metadata.get("page_label", "?")
+    if multi_doc:
+        return f"[Page {page} · {doc.metadata.get('filename', '?')}]"
+    return f"[Page {page}]"
+
+
+def select_passages(results_with_scores: list, total_chunks: int, is_generic: bool, k: int = 10) -> List[dict]:
+    """Threshold, rank and order search hits into labelled passages."""
+    if not results_with_scores:
+        return []
+
+    multi_doc = len({doc.metadata.get("doc_id") for doc, _ in results_with_scores}) > 1
+    if multi_doc:
+        norms = _normalize_per_document(results_with_scores)
+    else:
+        norms = [score for _, score in results_with_scores]
+    ranked = sorted(zip(results_with_scores, norms), key=lambda x: x[1], reverse=True)
+
+    # Threshold Adjustment:
+    # For OpenAI embeddings, 0.70 (Generic) and 0.75 (Specific) provide a good balance.
+    THRESHOLD = GENERIC_THRESHOLD if is_generic else SPECIFIC_THRESHOLD
+
+    # Skip filtering for very small PDFs to provide maximum context.
+    # Apply threshold for larger documents to reduce noise.
+    selected = [
+        (doc, score) for (doc, score), _ in ranked
+        if total_chunks <= NO_THRESHOLD_MAX_CHUNKS or score >= THRESHOLD
+    ]
+    if multi_doc:
+        # Per-doc quotas ka total thread budget se zyada na ho
+        selected = selected[:_fetch_k(total_chunks, is_generic, k)]
+
+    # ── Step 6: Fallback (Avoid "Information Not Found") ──────────────
+    # If the threshold was too strict and removed all chunks, use the top 5 results as a backup
+    # (multi-doc: top results of every document, by normalized score).
+    if not selected:
+        print("⚠️ Using fallback: Threshold was too strict.")
+        metrics.inc("retrieval_fallback_total", help="Threshold removed every hit; top results used")
+        if multi_doc:
+            n_docs   = len({doc.metadata.get("doc_id") for doc, _ in results_with_scores})
+            per_doc  = max(1, -(-5 // n_docs))
+            taken: dict = {}
+            for (doc, score), _ in ranked:
+                doc_id = doc.metadata.get("doc_id")
+                if taken.get(doc_id, 0) < per_doc:
+                    taken[doc_id] = taken.get(doc_id, 0) + 1
+                    selected.append((doc, score))
+        else:
+            selected = [(doc, score) for (doc, score), _ in ranked[:5]]
+
+    # ── Step 5: Sorting ───────────────────────────────────────────────
+    # Sort by document, then page number, to maintain logical flow for the LLM.
+    selected.sort(key=lambda x: (x[0].metadata.get("filename", ""), x[0].metadata.get("page_label", 0)))
+
+    return [
+        {
+            "label":   _label(doc, multi_doc),
+            "content": doc.page_content.strip(),
+            "score":   float(score),
+            "doc_id":  doc.metadata.get("doc_id"),
+            "page":    doc.metadata.get("page_label"),
+        }
+        for doc, score in selected
+    ]
+
+
+def format_context(passages: List[dict]) -> str:
+    parts = [f"{p['label']}: {p['content']}" for p in passages]
+    print(f"✅ Sent {len(parts)} chunks to LLM.")
+    return "\n\n---\n\n".join(parts)
+
+
+def _assemble_context(results_with_scores: list, total_chunks: int, is_generic: bool, k: int = 10) -> str:
+    return format_context(select_passages(results_with_scores, total_chunks, is_generic, k))
@@ -0,0 +1,144 @@
+# services/stream_buffer.py
+# ─────────────────────────────────────────────
+# Resumable SSE streams
+#   Har streamed reply ko ek stream_id milta hai aur har chunk ko ek
+#   sequence number (SSE `id:`). Generation background task me chalti hai
+#   aur chunks bounded in-memory replay buffer me jaate hain, taaki
+#   reconnect karne wala client `Last-Event-ID` se resume kar sake —
+#   bina retrieval / LLM call dobara chalaye.
+#
+#   Jo tokens kisi reader ne abhi tak nahi uthaye woh pichhle event me
+#   jud jaate hain (slow / disconnected client pe events kam bante hain).
+#   Cap pe pahunchne par last slot me truncation marker jaata hai aur
+#   generation rok di jaati hai — reply chupchaap nahi katta.
+# ─────────────────────────────────────────────
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+STREAM_TTL_SECONDS    = 300      # finished stream kitni der replay ke liye rakhein
+STREAM_MAX_ENTRIES    = 256      # ek time pe max buffered streams
+STREAM_MAX_EVENTS     = 16384    # ek stream me max events (runaway guard)
+STREAM_COALESCE_CHARS = 1024     # unread event ko isse bada nahi karte
+STREAM_TRUNCATED      = "\n\n⚠️ Reply truncated — stream limit reached."
+
+
+class StreamBuffer:
+    def __init__(self, stream_id: str, thread_id: str):
+        self.stream_id  = stream_id
+        self.thread_id  = thread_id
+        self.events: list[str] = []          # index + 1 == SSE event id
+        self.done       = False
+        self.truncated  = False
+        self._handed    = 0                  # events jo kisi reader ko mil chuke
+        self.created_at = time.monotonic()
+        self.updated_at = self.created_at
+        self._cond      = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    async def append(self, chunk: str) -> bool:
+        """Buffer a chunk. Returns False once the stream is truncated."""
+        async with self._cond:
+            if self.truncated:
+                return False
+            if (len(self.events) > self._handed
+                    and len(self.events[-1]) + len(chunk) <= STREAM_COALESCE_CHARS):
+                # Last event kisi ne padha nahi — usi me jodo
+                self.events[-1] += chunk
+            elif len(self.events) < STREAM_MAX_EVENTS - 1:
+                self.events.append(chunk)
+            else:
+                self.events.append(STREAM_TRUNCATED)
+                self.truncated = True
+            self.updated_at = time.monotonic()
+            self._cond.notify_all()
+            return not self.truncated
+
+    async def finish(self) -> None:
+        async with self._cond:
+            self.done       = True
+            self.updated_at = time.monotonic()
+            self._cond.notify_all()
+
+    async def read_from(self, last_event_id: int = 0) -> AsyncIterator[tuple[int, str]]:
+        """Yield (seq, chunk) for every event after `last_event_id`, tailing until done."""
+        seq = max(last_event_id, 0)
+        while True:
+            async with self._cond:
+                while seq >= len(self.events) and not self.done:
+                    await self._cond.wait()
+                pending = self.events[seq:]
+                done    = self.done
+                self._handed = max(self._handed, len(self.events))
+            for chunk in pending:
+                seq += 1
+                yield seq, chunk
+            if done and seq >= len(self.events):
+                return
+
+    def expired(self, now: float) -> bool:
+        return self.done and now - self.updated_at > STREAM_TTL_SECONDS
+
+
+# ── Registry ──────────────────────────────────
+_streams: "OrderedDict[str, StreamBuffer]" = OrderedDict()
+
+
+def _evict() -> None:
+    now = time.monotonic()
+    for sid in [sid for sid, buf in _streams.items() if buf.expired(now)]:
+        del _streams[sid]
+
+    # Capacity guard — sabse purane finished streams pehle nikalo
+    while len(_streams) > STREAM_MAX_ENTRIES:
+        victim = next((sid for sid, buf in _streams.items() if buf.done), None)
+        if victim is None:
+            break
+        del _streams[victim]
+
+
+def get_stream(stream_id: str) -> Optional[StreamBuffer]:
+    _evict()
+    return _streams.get(stream_id)
+
+
+def start_stream(thread_id: str, source: AsyncGenerator[str, None]) -> StreamBuffer:
+    """Register a new buffer and pump `source` into it on a background task."""
+    _evict()
+    buf = StreamBuffer(str(uuid.uuid4()), thread_id)
+    _streams[buf.stream_id] = buf
+
+    async def _pump():
+        try:
+            async for chunk in source:
+                if not await buf.append(chunk):
+                    print(f"⚠️  Stream {buf.stream_id} hit STREAM_MAX_EVENTS — truncated")
+                    break
+        except Exception as e:
+            await buf.append(f"❌ Error: {str(e)}")
+        finally:
+            await source.aclose()        # truncation pe LLM generation bhi band
+            await buf.finish()
+
+    buf.task = asyncio.create_task(_pump())
+    return buf
+
+
+async def sse_events(buf: StreamBuffer, last_event_id: int = 0) -> AsyncGenerator[str, None]:
+    """Serialize buffer events as SSE frames, resuming after `last_event_id`."""
+    if last_event_id == 0:
+        yield f"data: {json.dumps({'stream_id': buf.stream_id})}\n\n"
+    async for seq, chunk in buf.read_from(last_event_id):
+        yield f"id: {seq}\ndata: {json.dumps({'chunk': chunk})}\n\n"
+    yield f"data: {json.dumps({'done': True, 'stream_id': buf.stream_id})}\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        return 0
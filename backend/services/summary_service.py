@@ -0,0 +1,337 @@
+# services/summary_service.py
+# ─────────────────────────────────────────────
+# Precomputed document summaries + section outline
+#   Ingestion ke baad background me:
+#     1. Outline — PDF ka table of contents, warna detected headings
+#        (font size / bold + known section names)
+#     2. Map    — har section (ya page group) ka chhota summary
+#     3. Reduce — section summaries → ek document summary
+#   "summarize" / "overview" / "is there an Abstract?" jaise sawaal
+#   retrieval + bada context chhod kar in compact artifacts se answer
+#   hote hain.
+# ─────────────────────────────────────────────
+
+import os
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import fitz   # PyMuPDF
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage, SystemMessage
+from dotenv import load_dotenv
+
+from db.sqlite_conn import get_connection
+from services.query_intent import KNOWN_SECTIONS, is_section_query
+
+load_dotenv()
+
+summary_llm = ChatOpenAI(
+    model=os.getenv("SUMMARY_MODEL", "gpt-4o-mini"),
+    api_key=os.getenv("OPENAI_API_KEY"),
+    temperature=0,
+)
+
+SECTION_TARGET_CHARS = 8000      # page-group size when there is no outline
+SECTION_MAX_CHARS    = 12000     # text per map prompt
+MAX_SECTIONS         = 24
+REDUCE_MAX_CHARS     = 12000
+MAX_HEADINGS         = 100
+SUMMARY_WORKERS      = 2         # documents summarised in parallel
+MAP_WORKERS          = 4         # section LLM calls per document
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ─────────────────────────────────────────────
+# 1. Outline — TOC, warna detected headings
+# ─────────────────────────────────────────────
+def _detect_headings(pdf) -> List[dict]:
+    lines = []
+    sizes = Counter()
+    for page_no, page in enumerate(pdf, start=1):
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                spans = [s for s in line["spans"] if s["text"].strip()]
+                if not spans:
+                    continue
+                text = " ".join(s["text"].strip() for s in spans)
+                size = max(s["size"] for s in spans)
+                bold = all(s["flags"] & 16 for s in spans)
+                sizes[round(size, 1)] += len(text)
+                lines.append((page_no, text, size, bold))
+
+    if not sizes:
+        return []
+    body_size = sizes.most_common(1)[0][0]
+
+    headings = []
+    for page_no, text, size, bold in lines:
+        if not (3 <= len(text) <= 80) or text.endswith((".", ",", ";")):
+            continue
+        if sum(c.isalpha() for c in text) < len(text) / 2:
+            continue
+        known = bool(KNOWN_SECTIONS.match(text))
+        if size >= body_size * 1.15 or (bold and known) or (known and len(text) <= 30):
+            level = 1 if size >= body_size * 1.4 else 2
+            headings.append({"level": level, "title": text, "page": page_no})
+        if len(headings) >= MAX_HEADINGS:
+            break
+    return headings
+
+
+def build_outline(pdf) -> List[dict]:
+    toc = pdf.get_toc(simple=True)
+    if toc:
+        return [
+            {"level": level, "title": title.strip(), "page": page}
+            for level, title, page in toc[:MAX_HEADINGS] if title.strip()
+        ]
+    return _detect_headings(pdf)
+
+
+# ─────────────────────────────────────────────
+# 2. Sections for the map step
+# ─────────────────────────────────────────────
+def _page_groups(pages: List[str], start: int, end: int, title: Optional[str]) -> List[dict]:
+    """Split pages[start..end] (1-based, inclusive) into ~SECTION_TARGET_CHARS groups."""
+    groups, first, buf = [], start, []
+    for page_no in range(start, end + 1):
+        buf.append(pages[page_no - 1])
+        if sum(len(t) for t in buf) >= SECTION_TARGET_CHARS or page_no == end:
+            label = f"Pages {first}–{page_no}"
+            groups.append({
+                "title": f"{title} ({label})" if title and (first, page_no) != (start, end) else (title or label),
+                "pages": [first, page_no],
+                "text":  "\n".join(buf),
+            })
+            first, buf = page_no + 1, []
+    return groups
+
+
+def _sections(pages: List[str], outline: List[dict]) -> List[dict]:
+    top = [h for h in outline if h["level"] <= 2 and 1 <= h["page"] <= len(pages)]
+
+    if len(top) >= 2:
+        titles = {}
+        for h in top:
+            titles.setdefault(h["page"], h["title"])
+        starts = sorted(titles)
+        if starts[0] != 1:
+            starts.insert(0, 1)
+        sections = []
+        for i, start in enumerate(starts):
+            end = (starts[i + 1] - 1) if i + 1 < len(starts) else len(pages)
+            # Lambe sections page groups me toot jaate hain
+            sections += _page_groups(pages, start, max(end, start), titles.get(start, "Front matter"))
+    else:
+        sections = _page_groups(pages, 1, len(pages), None)
+
+    # Bahut saare sections → adjacent merge
+    while len(sections) > MAX_SECTIONS:
+        merged = []
+        for i in range(0, len(sections), 2):
+            pair = sections[i:i + 2]
+            merged.append({
+                "title": " / ".join(s["title"] for s in pair),
+                "pages": [pair[0]["pages"][0], pair[-1]["pages"][1]],
+                "text":  "\n".join(s["text"] for s in pair),
+            })
+        sections = merged
+    return [s for s in sections if s["text"].strip()]
+
+
+# ─────────────────────────────────────────────
+# 3. Map-reduce summarisation
+# ─────────────────────────────────────────────
+def _summarize_text(text: str, instruction: str) -> str:
+    response = summary_llm.invoke([
+        SystemMessage(content=(
+            "You summarise PDF content faithfully. Use only the given text. "
+            "Keep names, numbers and key terms exact."
+        )),
+        HumanMessage(content=f"{instruction}\n\n=== TEXT ===\n{text[:SECTION_MAX_CHARS]}"),
+    ])
+    return response.content.strip()
+
+
+def _reduce(summaries: List[str]) -> str:
+    combined = "\n\n".join(summaries)
+    if len(combined) <= REDUCE_MAX_CHARS or len(summaries) == 1:
+        return _summarize_text(
+            combined,
+            "Write a document-level summary (150–250 words) covering purpose, "
+            "main content, key findings and conclusion.",
+        )
+    # Recursive reduce in groups
+    groups, buf = [], []
+    for s in summaries:
+        if buf and len("\n\n".join(buf + [s])) > REDUCE_MAX_CHARS:
+            groups.append(buf)
+            buf = []
+        buf.append(s)
+    groups.append(buf)
+    partials = [
+        _summarize_text("\n\n".join(g), "Merge these section summaries into one concise summary.")
+        for g in groups
+    ]
+    return _reduce(partials)
+
+
+def summarize_document(doc_id: str, file_path: str) -> None:
+    _set_status(doc_id, "pending")
+    try:
+        with fitz.open(file_path) as pdf:
+            outline = build_outline(pdf)
+            pages   = [page.get_text() for page in pdf]
+
+        sections = _sections(pages, outline)
+        if not sections:
+            raise ValueError("no extractable text")
+
+        with ThreadPoolExecutor(max_workers=MAP_WORKERS) as pool:
+            section_summaries = list(pool.map(
+                lambda s: _summarize_text(
+                    s["text"], f"Summarise the section '{s['title']}' in 2–4 sentences."
+                ),
+                sections,
+            ))
+
+        summary = _reduce([
+            f"[{s['title']}] {text}" for s, text in zip(sections, section_summaries)
+        ])
+
+        conn = get_connection()
+        try:
+            conn.execute(
+                """UPDATE document_summaries
+                   SET status = 'ready', summary = ?, outline = ?, sections = ?, updated_at = ?
+                   WHERE doc_id = ?""",
+                (
+                    summary,
+                    json.dumps(outline),
+                    json.dumps([
+                        {"title": s["title"], "pages": s["pages"], "summary": text}
+                        for s, text in zip(sections, section_summaries)
+                    ]),
+                    _now(),
+                    doc_id,
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"📝 Summary ready for doc_id='{doc_id}' ({len(sections)} sections, {len(outline)} headings)")
+
+    except Exception as e:
+        print(f"⚠️  Summary failed for doc_id='{doc_id}': {e}")
+        _set_status(doc_id, "failed")
+
+
+def _set_status(doc_id: str, status: str) -> None:
+    conn = get_connection()
+    try:
+        conn.execute(
+            """INSERT INTO document_summaries (doc_id, status, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(doc_id) DO UPDATE SET status = excluded.status,
+                                                 updated_at = excluded.updated_at""",
+            (doc_id, status, _now()),
+        )
+        conn.commit()
+    except Exception as e:
+        # Document beech me delete ho gaya (FK) — kuch nahi karna
+        print(f"⚠️  Summary status update skipped for doc_id='{doc_id}': {e}")
+    finally:
+        conn.close()
+
+
+def schedule_summary(doc_id: str, file_path: str) -> None:
+    _executor.submit(summarize_document, doc_id, file_path)
+
+
+def resume_pending_summaries() -> int:
+    """Re-queue summaries lost to a restart, and backfill documents that never had one.
+
+    Executor in-memory hai — restart pe `pending` rows aur is feature se
+    pehle upload hue documents kabhi ready nahi hote, aur
+    get_ready_summaries ko thread ke saare documents ready chahiye.
+    """
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """SELECT d.doc_id, d.file_path
+               FROM documents d LEFT JOIN document_summaries s ON s.doc_id = d.doc_id
+               WHERE s.doc_id IS NULL OR s.status = 'pending'
+               ORDER BY d.uploaded_at ASC"""
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for r in rows:
+        if os.path.exists(r["file_path"]):
+            schedule_summary(r["doc_id"], r["file_path"])
+        else:
+            _set_status(r["doc_id"], "failed")
+    if rows:
+        print(f"📝 Re-queued {len(rows)} document summaries")
+    return len(rows)
+
+
+# ─────────────────────────────────────────────
+# 4. Read side — chat turn ke liye artifacts
+# ─────────────────────────────────────────────
+def get_ready_summaries(thread_id: str) -> Optional[List[dict]]:
+    """Artifacts for every document of the thread, or None if any is not ready."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """SELECT d.doc_id, d.filename, s.status, s.summary, s.outline, s.sections
+               FROM documents d LEFT JOIN document_summaries s ON s.doc_id = d.doc_id
+               WHERE d.thread_id = ? ORDER BY d.uploaded_at ASC""",
+            (thread_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    if not rows or any(r["status"] != "ready" for r in rows):
+        return None
+    return [
+        {
+            "doc_id":   r["doc_id"],
+            "filename": r["filename"],
+            "summary":  r["summary"],
+            "outline":  json.loads(r["outline"] or "[]"),
+            "sections": json.loads(r["sections"] or "[]"),
+        }
+        for r in rows
+    ]
+
+
+def summary_passages(artifacts: List[dict], query: str) -> List[dict]:
+    """Artifacts → passages (same shape as retrieval) for the prompt and extractive fallback."""
+    with_sections = is_section_query(query)
+    passages = []
+    for a in artifacts:
+        outline = "\n".join(
+            f"{'  ' * (h['level'] - 1)}- {h['title']} (p.{h['page']})" for h in a["outline"]
+        ) or "(no headings detected)"
+        # Summary pehle — extractive fallback isi ko truncate karke dikhata hai
+        content = f"SUMMARY:\n{a['summary']}\n\nOUTLINE:\n{outline}"
+        if with_sections:
+            content += "\n\nSECTION SUMMARIES:\n" + "\n".join(
+                f"[{s['title']} · pages {s['pages'][0]}–{s['pages'][1]}]: {s['summary']}"
+                for s in a["sections"]
+            )
+        passages.append({
+            "label":   f"[Summary · {a['filename']}]",
+            "content": content,
+            "score":   1.0,
+            "doc_id":  a["doc_id"],
+        })
+    return passages
@@ -1,6 +1,19 @@
 import uuid
+import json
+import html
+import base64
 from datetime import datetime, timezone
-from db.sqlite_conn import get_connection
+from typing import Optional
+from db.sqlite_conn import get_connection, PREVIEW_CHARS
+
+THREADS_PAGE_LIMIT = 30
+THREADS_MAX_LIMIT  = 100
+SEARCH_PAGE_LIMIT  = 20
+SEARCH_MAX_LIMIT   = 50
+
+# snippet() ke markers — private-use chars, taaki message text ko escape
+# karne ke baad hi <mark> tags lagein
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
 
 
 def _now() -> str:
@@ -11,9 +24,11 @@ def create_thread(name: str = "New Chat", user_id: str = "") -> str:
     thread_id = str(uuid.uuid4())
     conn = get_connection()
     try:
+        now = _now()
         conn.execute(
-            "INSERT INTO threads (thread_id, user_id, name, created_at) VALUES (?, ?, ?, ?)",
-            (thread_id, user_id, name, _now()),
+            "INSERT INTO threads (thread_id, user_id, name, created_at, last_activity_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (thread_id, user_id, name, now, now),
         )
         conn.commit()
     finally:
@@ -21,25 +36,164 @@ def create_thread(name: str = "New Chat", user_id: str = "") -> str:
     return thread_id
 
 
-def get_threads(user_id: str) -> list[dict]:
+def _encode_cursor(*values) -> str:
+    raw = json.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str, n: int = 2) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != n:
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def get_threads(
+    user_id: str,
+    limit: int = THREADS_PAGE_LIMIT,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Keyset-paginated thread listing, newest activity first.
+    Uses idx_threads_user_activity, so each page costs O(limit) regardless of
+    how many threads the user has. Raises ValueError for a malformed cursor.
+    """
+    limit = max(1, min(limit, THREADS_MAX_LIMIT))
+
+    sql = (
+        "SELECT thread_id, name, created_at, last_activity_at, message_count, "
+        "last_message_preview, document_count FROM threads WHERE user_id = ?"
+    )
+    params: list = [user_id]
+
+    if cursor:
+        after_activity, after_id = _decode_cursor(cursor)
+        sql += " AND (last_activity_at, thread_id) < (?, ?)"
+        params += [str(after_activity), str(after_id)]
+
+    sql += " ORDER BY last_activity_at DESC, thread_id DESC LIMIT ?"
+    params.append(limit + 1)
+
     conn = get_connection()
     try:
-        rows = conn.execute(
-            "SELECT thread_id, name, created_at FROM threads "
-            "WHERE user_id = ? ORDER BY created_at DESC",
-            (user_id,)
-        ).fetchall()
-        return [dict(r) for r in rows]
+        rows = conn.execute(sql, params).fetchall()
     finally:
         conn.close()
 
+    has_more = len(rows) > limit
+    threads  = [dict(r) for r in rows[:limit]]
+    next_cursor = (
+        _encode_cursor(threads[-1]["last_activity_at"], threads[-1]["thread_id"])
+        if has_more else None
+    )
+    return {"threads": threads, "next_cursor": next_cursor, "has_more": has_more}
+
+
+def _fts_query(text: str) -> str:
+    """User text → safe FTS5 MATCH expression (quoted terms, prefix on the last)."""
+    terms = [t.replace('"', '""') for t in text.split() if t.strip('"')]
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet: str) -> str:
+    # Pehle escape, phir markers → tags (message me raw HTML kabhi live nahi)
+    return (
+        html.escape(snippet)
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+
+
+def search_messages(
+    user_id: str,
+    query: str,
+    limit: int = SEARCH_PAGE_LIMIT,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Ranked full-text search over all of a user's messages (bm25, best first).
+    Cursor is keyset on (rank, message id). Raises ValueError for a malformed cursor.
+
+    `snippet` is HTML-escaped message text with matches wrapped in <mark>.
+    The FTS index is shared across users — MATCH scores every hit before the
+    user filter, so a term present in most messages costs ~80 ms on 30k
+    messages (selective terms ~1 ms).
+    """
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    match = _fts_query(query)
+    if not match:
+        return {"results": [], "next_cursor": None, "has_more": False}
+
+    sql = """
+        WITH hits AS (
+            SELECT m.id, m.thread_id, t.name AS thread_name, m.role, m.created_at,
+                   bm25(messages_fts) AS rank
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            JOIN threads  t ON t.thread_id = m.thread_id
+            WHERE messages_fts MATCH ? AND t.user_id = ?
+        )
+        SELECT * FROM hits
+    """
+    params: list = [match, user_id]
+
+    if cursor:
+        after_rank, after_id = _decode_cursor(cursor)
+        sql += " WHERE rank > ? OR (rank = ? AND id < ?)"
+        params += [float(after_rank), float(after_rank), int(after_id)]
+
+    sql += " ORDER BY rank ASC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = get_connection()
+    try:
+        rows     = conn.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        results  = [dict(r) for r in rows[:limit]]
+
+        # Snippets sirf is page ke rows ke liye — har match ke liye nahi
+        if results:
+            ids = [r["id"] for r in results]
+            snippets = dict(conn.execute(
+                f"""SELECT rowid, snippet(messages_fts, 0, ?, ?, '…', 16)
+                    FROM messages_fts
+                    WHERE messages_fts MATCH ? AND rowid IN ({",".join("?" * len(ids))})""",
+                [_MARK_OPEN, _MARK_CLOSE, match, *ids],
+            ).fetchall())
+            for r in results:
+                r["snippet"] = _highlight(snippets.get(r["id"], ""))
+    finally:
+        conn.close()
+
+    next_cursor = (
+        _encode_cursor(results[-1]["rank"], results[-1]["id"]) if has_more else None
+    )
+    return {"results": results, "next_cursor": next_cursor, "has_more": has_more}
+
 
 def save_message(thread_id: str, role: str, content: str) -> dict:
     conn = get_connection()
     try:
+        now = _now()
         cursor = conn.execute(
             "INSERT INTO messages (thread_id, role, content, created_at) VALUES (?, ?, ?, ?)",
-            (thread_id, role, content, _now()),
+            (thread_id, role, content, now),
+        )
+        # ✅ Denormalized sidebar columns — same transaction
+        conn.execute(
+            """UPDATE threads SET
+                   last_activity_at     = ?,
+                   message_count        = message_count + 1,
+                   last_message_preview = ?
+               WHERE thread_id = ?""",
+            (now, content[:PREVIEW_CHARS], thread_id),
         )
         conn.commit()
         row = conn.execute(
@@ -0,0 +1,225 @@
+# services/tiering_service.py
+# ─────────────────────────────────────────────
+# Hot/cold vector tiering
+#   Jo threads TIER_IDLE_DAYS se idle hain, unke vectors live Pinecone
+#   index se nikal kar local archive me chale jaate hain:
+#     {ARCHIVE_DIR}/{doc_id}.npz → int8 codes + per-vector scale + ids + metadata
+#   Thread dobara active hote hi (messages open / chat) vectors wapas
+#   upsert ho jaate hain — live index sirf working set rakhta hai.
+# ─────────────────────────────────────────────
+
+import os
+import json
+import asyncio
+import threading
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+from db.sqlite_conn import get_connection
+from services.ann_index import quantize_int8 as _quantize, dequantize_int8 as _dequantize
+from services.document_service import (
+    pinecone_index,
+    archive_path_for,
+    get_documents_for_thread,
+    EMBEDDING_DIM,
+)
+
+TIER_IDLE_DAYS           = int(os.getenv("TIER_IDLE_DAYS", "7"))
+TIERING_INTERVAL_SECONDS = int(os.getenv("TIERING_INTERVAL_SECONDS", "21600"))   # 0 = disabled
+TIERING_DOCS_PER_PASS    = 50
+UPSERT_BATCH             = 100
+FETCH_BATCH              = 100
+
+_thread_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _thread_lock(thread_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _thread_locks.setdefault(thread_id, threading.Lock())
+
+
+# ── Pinecone read ─────────────────────────────
+def _fetch_doc_vectors(doc_id: str, chunk_count: int) -> tuple[list, list, list]:
+    """Return (ids, values, metadata) for every vector of a document."""
+    ids = [vid for page in pinecone_index.list(prefix=f"{doc_id}#") for vid in page]
+
+    if not ids:
+        # Purane uploads ke random ids — metadata filter se nikaalo
+        probe = np.random.default_rng(0).standard_normal(EMBEDDING_DIM)
+        res = pinecone_index.query(
+            vector=(probe / np.linalg.norm(probe)).tolist(),
+            top_k=max(chunk_count, 1),
+            filter={"doc_id": {"$eq": doc_id}},
+            include_values=True,
+            include_metadata=True,
+        )
+        return (
+            [m.id for m in res.matches],
+            [m.values for m in res.matches],
+            [dict(m.metadata or {}) for m in res.matches],
+        )
+
+    values, metadata = [], []
+    for i in range(0, len(ids), FETCH_BATCH):
+        fetched = pinecone_index.fetch(ids=ids[i:i + FETCH_BATCH]).vectors
+        for vid in ids[i:i + FETCH_BATCH]:
+            values.append(fetched[vid].values)
+            metadata.append(dict(fetched[vid].metadata or {}))
+    return ids, values, metadata
+
+
+# ─────────────────────────────────────────────
+# 1. Archive one document (hot → cold)
+# ─────────────────────────────────────────────
+def archive_document(doc: dict) -> int:
+    doc_id = doc["doc_id"]
+    ids, values, metadata = _fetch_doc_vectors(doc_id, doc["chunk_count"])
+    if not ids or len(ids) < doc["chunk_count"]:
+        print(f"⚠️  Tiering skipped for doc_id='{doc_id}': {len(ids)}/{doc['chunk_count']} vectors found")
+        return 0
+
+    codes, scales = _quantize(np.asarray(values, dtype=np.float32))
+
+    path = archive_path_for(doc_id)
+    tmp  = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(
+            f,
+            codes=codes,
+            scales=scales,
+            ids=np.asarray(ids),
+            metadata=np.asarray(json.dumps(metadata)),
+        )
+    os.replace(tmp, path)
+
+    # Archive disk pe safe hai — delete se PEHLE cold mark karo. Koi delete
+    # batch beech me fail ho toh bhi document cold + poora archive rehta
+    # hai; rehydrate saare ids dobara upsert karta hai (bache hue overwrite).
+    conn = get_connection()
+    try:
+        conn.execute(
+            "UPDATE documents SET tier = 'cold', tiered_at = ? WHERE doc_id = ?",
+            (_now(), doc_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    for i in range(0, len(ids), UPSERT_BATCH):
+        pinecone_index.delete(ids=ids[i:i + UPSERT_BATCH])
+
+    print(f"🧊 Archived {len(ids)} vectors for doc_id='{doc_id}' ({os.path.getsize(path)} bytes)")
+    return len(ids)
+
+
+# ─────────────────────────────────────────────
+# 2. Rehydrate one document (cold → hot)
+# ─────────────────────────────────────────────
+def rehydrate_document(doc_id: str) -> int:
+    path = archive_path_for(doc_id)
+    if not os.path.exists(path):
+        print(f"⚠️  Archive missing for doc_id='{doc_id}'")
+        return 0
+
+    with np.load(path) as data:
+        vectors  = _dequantize(data["codes"], data["scales"])
+        ids      = data["ids"].tolist()
+        metadata = json.loads(str(data["metadata"]))
+
+    for i in range(0, len(ids), UPSERT_BATCH):
+        pinecone_index.upsert(vectors=[
+            {"id": vid, "values": vec.tolist(), "metadata": meta}
+            for vid, vec, meta in zip(
+                ids[i:i + UPSERT_BATCH],
+                vectors[i:i + UPSERT_BATCH],
+                metadata[i:i + UPSERT_BATCH],
+            )
+        ])
+
+    conn = get_connection()
+    try:
+        conn.execute(
+            "UPDATE documents SET tier = 'hot', tiered_at = ? WHERE doc_id = ?",
+            (_now(), doc_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.remove(path)
+    print(f"🔥 Rehydrated {len(ids)} vectors for doc_id='{doc_id}'")
+    return len(ids)
+
+
+def ensure_thread_hot(thread_id: str) -> int:
+    """Rehydrate any cold documents of a thread before it is searched."""
+    # Tier hamesha lock ke andar padho — caller ki docs list purani ho sakti
+    # hai, aur chalta hua archive pass isi lock ke andar index khaali karta hai
+    with _thread_lock(thread_id):
+        cold = [d for d in get_documents_for_thread(thread_id) if d["tier"] == "cold"]
+        return sum(rehydrate_document(d["doc_id"]) for d in cold)
+
+
+def _still_idle(thread_id: str, cutoff: str) -> bool:
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT last_activity_at FROM threads WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return bool(row) and row["last_activity_at"] < cutoff
+
+
+# ─────────────────────────────────────────────
+# 3. Tiering pass — idle threads ke hot docs archive karo
+# ─────────────────────────────────────────────
+def run_tiering_pass(idle_days: int = TIER_IDLE_DAYS, limit: int = TIERING_DOCS_PER_PASS) -> dict:
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=idle_days)).isoformat()
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """SELECT d.doc_id, d.thread_id, d.chunk_count
+               FROM documents d JOIN threads t ON t.thread_id = d.thread_id
+               WHERE d.tier = 'hot' AND t.last_activity_at < ?
+               ORDER BY t.last_activity_at ASC LIMIT ?""",
+            (cutoff, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    archived_docs    = 0
+    archived_vectors = 0
+    for row in rows:
+        with _thread_lock(row["thread_id"]):
+            if not _still_idle(row["thread_id"], cutoff):
+                continue
+            try:
+                n = archive_document(dict(row))
+            except Exception as e:
+                print(f"⚠️  Tiering error for doc_id='{row['doc_id']}': {e}")
+                continue
+        if n:
+            archived_docs    += 1
+            archived_vectors += n
+
+    return {"candidates": len(rows), "archived_docs": archived_docs, "archived_vectors": archived_vectors}
+
+
+async def tiering_loop() -> None:
+    if TIERING_INTERVAL_SECONDS <= 0:
+        return
+    while True:
+        await asyncio.sleep(TIERING_INTERVAL_SECONDS)
+        try:
+            report = await asyncio.to_thread(run_tiering_pass)
+            print(f"🧊 Tiering: {report}")
+        except Exception as e:
+            print(f"⚠️  Tiering pass failed: {e}")
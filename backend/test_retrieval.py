@@ -1,4 +1,5 @@
 from services.document_service import retrieve_context
+from services.tiering_service import ensure_thread_hot
 from db.sqlite_conn import get_connection
 
 # Step 1: Sabse latest thread_id nikalo
@@ -16,6 +17,7 @@ for r in rows:
 if rows:
     thread_id = rows[0]["thread_id"]
     print(f"\n=== Testing retrieve_context for thread: {thread_id} ===")
+    ensure_thread_hot(thread_id)   # archived (cold) vectors pehle live index me
     context = retrieve_context(thread_id, "abstract")
     print(f"\nContext length: {len(context)}")
     print(f"Context preview:\n{context[:500]}")
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from services.circuit_breaker import CircuitBreaker
+
+
+def _half_open() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_interrupted_trial_frees_the_slot():
+    breaker = _half_open()
+    assert breaker.allow()
+
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.attempt():
+            raise asyncio.CancelledError()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_trial_outcome_is_kept():
+    breaker = _half_open()
+    assert breaker.allow()
+    with breaker.attempt():
+        breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_only_one_trial_in_flight():
+    breaker = _half_open()
+    assert breaker.allow()
+    with breaker.attempt():
+        assert not breaker.allow()
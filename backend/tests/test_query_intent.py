@@ -0,0 +1,59 @@
+import pytest
+
+from services.query_intent import is_section_query, is_summary_query
+
+
+@pytest.mark.parametrize("query", [
+    "summarize",
+    "Summarize this paper",
+    "summarise the pdf in 50 words",
+    "give me a brief summary",
+    "Give me an overview of this document",
+    "overview",
+    "tl;dr",
+    "tell me about this",
+    "Tell me about the paper.",
+    "what is this?",
+    "what's this paper about",
+    "what is the document about",
+    "describe this pdf",
+    "can you summarize this please",
+    "explain the paper in 3 sentences",
+    "Is there an abstract?",
+    "does the paper have a conclusion section?",
+    "Does it contain references",
+])
+def test_whole_document_questions(query):
+    assert is_summary_query(query)
+
+
+@pytest.mark.parametrize("query", [
+    "summary of page 7",
+    "what is the summary of results in table 3?",
+    "give an overview of the training loss in section 4",
+    "what is this equation on page 5?",
+    "summarize section 2",
+    "summarize figure 3",
+    "what is the learning rate",
+    "explain section 3",
+    "are there any results on ImageNet?",
+    "is there an abstract on page 2 that mentions transformers?",
+    "what is the overview of the architecture",
+    # Follow-ups to the previous answer
+    "explain that",
+    "explain this",
+    "what is it",
+    "what is that",
+    "describe it",
+    "tell me more about that",
+    "summarize that",
+    "summarize it",
+])
+def test_specific_questions_use_retrieval(query):
+    assert not is_summary_query(query)
+
+
+def test_section_presence_only_for_short_questions():
+    assert is_section_query("is there a methodology section?")
+    assert not is_section_query("summarize this paper")
+    assert not is_section_query("are there results for BERT?")
@@ -0,0 +1,50 @@
+import asyncio
+
+from services import stream_buffer
+from services.stream_buffer import STREAM_TRUNCATED, start_stream
+
+
+async def _tokens(n):
+    for i in range(n):
+        yield f"t{i} "
+        await asyncio.sleep(0)
+
+
+def _expected(n):
+    return "".join(f"t{i} " for i in range(n))
+
+
+def test_unread_tokens_are_coalesced_losslessly():
+    async def run():
+        buf = start_stream("thread", _tokens(3000))
+        await buf.task
+        return buf
+
+    buf = asyncio.run(run())
+    assert "".join(buf.events) == _expected(3000)
+    assert len(buf.events) < 100
+    assert not buf.truncated
+
+
+def test_live_reader_sees_every_token():
+    async def run():
+        buf = start_stream("thread", _tokens(200))
+        return [chunk async for _, chunk in buf.read_from(0)]
+
+    assert "".join(asyncio.run(run())) == _expected(200)
+
+
+def test_cap_appends_truncation_marker(monkeypatch):
+    monkeypatch.setattr(stream_buffer, "STREAM_MAX_EVENTS", 10)
+    monkeypatch.setattr(stream_buffer, "STREAM_COALESCE_CHARS", 1)
+
+    async def run():
+        buf = start_stream("thread", _tokens(100))
+        await buf.task
+        return buf
+
+    buf = asyncio.run(run())
+    assert buf.truncated
+    assert len(buf.events) == 10
+    assert buf.events[-1] == STREAM_TRUNCATED
+    assert "".join(buf.events[:-1]) == _expected(9)
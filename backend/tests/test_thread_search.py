@@ -0,0 +1,18 @@
+from db import sqlite_conn
+from services.thread_services import create_thread, save_message, search_messages
+
+
+def test_snippet_escapes_message_html(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_conn, "DB_PATH", str(tmp_path / "test.db"))
+    sqlite_conn.init_db()
+
+    thread_id = create_thread("t", "user-1")
+    save_message(thread_id, "user", "see <img src=x onerror=alert(1)> for the image")
+    save_message(create_thread("t", "user-2"), "user", "another image")
+
+    results = search_messages("user-1", "image")["results"]
+
+    assert len(results) == 1
+    assert results[0]["snippet"] == (
+        "see &lt;img src=x onerror=alert(1)&gt; for the <mark>image</mark>"
+    )
@@ -132,54 +132,92 @@ const PromptSection = () => {
     setMessages(prev => [...prev, { role: "user", content: userMsg }]);
     setMessages(prev => [...prev, { role: "ai", content: "" }]);
 
-    try {
-      const response = await fetch(`${API}/chat/stream`, {  // ✅
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "x-user-id":    user?.id || "",
-        },
-        body: JSON.stringify({
-          message:   userMsg,
-          thread_id: activeThreadId,
-        }),
-      });
+    // ✅ Resumable stream — reconnect via GET /chat/stream/{id} with Last-Event-ID
+    let streamId    = null;
+    let lastEventId = 0;
+    let finished    = false;
 
-      if (!response.ok) throw new Error("Stream request failed");
+    const appendChunk = (chunk) => {
+      setMessages(prev => {
+        const updated = [...prev];
+        const last    = updated[updated.length - 1];
+        if (last?.role === "ai") {
+          updated[updated.length - 1] = {
+            ...last,
+            content: last.content + chunk,
+          };
+        }
+        return updated;
+      });
+    };
 
+    const readStream = async (response) => {
       const reader  = response.body.getReader();
       const decoder = new TextDecoder();
+      let buffer    = "";
 
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const text  = decoder.decode(value, { stream: true });
-        const lines = text.split("\n");
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop();
 
-        for (const line of lines) {
-          if (!line.startsWith("data: ")) continue;
+        for (const frame of frames) {
+          let eventId = null;
+          let data    = null;
+          for (const line of frame.split("\n")) {
+            if (line.startsWith("id: "))   eventId = parseInt(line.slice(4), 10);
+            if (line.startsWith("data: ")) data    = line.slice(6);
+          }
+          if (!data) continue;
           try {
-            const json = JSON.parse(line.slice(6));
-            if (json.done) break;
-            if (json.chunk) {
-              setMessages(prev => {
-                const updated = [...prev];
-                const last    = updated[updated.length - 1];
-                if (last?.role === "ai") {
-                  updated[updated.length - 1] = {
-                    ...last,
-                    content: last.content + json.chunk,
-                  };
-                }
-                return updated;
-              });
+            const json = JSON.parse(data);
+            if (json.stream_id) streamId = json.stream_id;
+            if (json.done) { finished = true; return; }
+            if (json.chunk && eventId && eventId > lastEventId) {
+              lastEventId = eventId;
+              appendChunk(json.chunk);
             }
           } catch (e) {
             // skip malformed chunk
           }
         }
       }
+    };
+
+    try {
+      const response = await fetch(`${API}/chat/stream`, {  // ✅
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "x-user-id":    user?.id || "",
+        },
+        body: JSON.stringify({
+          message:   userMsg,
+          thread_id: activeThreadId,
+        }),
+      });
+
+      if (!response.ok) throw new Error("Stream request failed");
+      streamId = response.headers.get("X-Stream-Id");
+
+      for (let attempt = 0; !finished; attempt++) {
+        try {
+          const res = attempt === 0
+            ? response
+            : await fetch(`${API}/chat/stream/${streamId}`, {
+                headers: { "Last-Event-ID": String(lastEventId) },
+              });
+          if (!res.ok) throw new Error("Stream resume failed");
+          await readStream(res);
+          if (!finished) throw new Error("Stream interrupted");
+        } catch (err) {
+          if (!streamId || attempt >= 3) throw err;
+          await new Promise(r => setTimeout(r, 1000 * (attempt + 1)));
+        }
+      }
 
     } catch (error) {
       setMessages(prev => {
@@ -15,6 +15,8 @@ const Sidebar = ({ isOpen, toggleSidebar }) => {
     setActiveThreadId,
     loadingThreads,
     deleteThread,
+    loadMoreThreads,
+    hasMoreThreads,
   } = useChat();
 
   const { signOut, openUserProfile } = useClerk();
@@ -136,6 +138,15 @@ const Sidebar = ({ isOpen, toggleSidebar }) => {
                 </div>
               ))
             )}
+
+            {!loadingThreads && hasMoreThreads && (
+              <button
+                onClick={loadMoreThreads}
+                className="w-full px-2 py-2 text-xs text-gray-500 hover:text-gray-200 transition-colors"
+              >
+                Load more
+              </button>
+            )}
           </div>
         </div>
 
@@ -9,6 +9,7 @@ export const ChatProvider = ({ children }) => {
   const { user } = useUser();
 
   const [threads, setThreads]                 = useState([]);
+  const [threadsCursor, setThreadsCursor]     = useState(null);
   const [activeThreadId, setActiveThreadId]   = useState(null);
   const [messages, setMessages]               = useState([]);
   const [localPdfBubbles, setLocalPdfBubbles] = useState({});
@@ -30,7 +31,8 @@ export const ChatProvider = ({ children }) => {
         `${API}/thread/thread-all`,  // ✅
         authHeaders()
       );
-      setThreads(response.data);
+      setThreads(response.data.threads);
+      setThreadsCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Error fetching threads:", error);
     } finally {
@@ -38,6 +40,21 @@ export const ChatProvider = ({ children }) => {
     }
   };
 
+  // ✅ Keyset pagination — next page after the last loaded thread
+  const loadMoreThreads = async () => {
+    if (!user || !threadsCursor) return;
+    try {
+      const response = await axios.get(
+        `${API}/thread/thread-all?cursor=${encodeURIComponent(threadsCursor)}`,
+        authHeaders()
+      );
+      setThreads(prev => [...prev, ...response.data.threads]);
+      setThreadsCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Error fetching more threads:", error);
+    }
+  };
+
   const fetchMessages = async (id) => {
     if (!id) return;
     setLoadingMessages(true);
@@ -145,6 +162,8 @@ export const ChatProvider = ({ children }) => {
       loadingMessages,
       fetchMessages,
       refreshThreads:  fetchThreads,
+      loadMoreThreads,
+      hasMoreThreads:  !!threadsCursor,
       addPdfBubble,
       deleteThread,
       authHeaders,